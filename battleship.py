@@ -1,54 +1,326 @@
 import numpy as np
 from numpy import unravel_index
 from battleship_scripts import colors
-import copy
+from battleship_scripts.placements import get_placements
+from battleship_scripts.counting import count_fleets, estimate_fleets, max_ghost_leaves, MAX_WORK
+from battleship_scripts.density import DensityTracker, fleet_density, fleet_counts
+from battleship_scripts.state import State, ship_cells
+from battleship_scripts.cache import TranspositionTable
+from battleship_scripts.symmetry import canonical_key
+from battleship_scripts.sampling import PosteriorSampler
+from battleship_scripts.metrics import timed
+from battleship_scripts.information import outcome_entropy
 from collections import defaultdict
+import time
 from pandas import *
 
 BOARD_SIZE = 10
 DEFAULT_SHIP_SIZES = [5, 4, 3, 3, 2]
-COL_REPRESENTATION = "ABCDEFGHIJ"
-
-# returns true if in bounds
-def check_bounds(coordinate):
-    return 0 <= coordinate[0] < BOARD_SIZE and 0 <= coordinate[1] < BOARD_SIZE
-
-def merge_ship_instances(start='1'):
-    main = TOTAL_INSTANCES[start]
-    if start not in TOTAL_INSTANCES.keys():
-        return
-    ids = [i_id for i_id in TOTAL_INSTANCES.keys() if (i_id.startswith(start) and len(i_id) == len(start) + 1)]
-    if ids:
-        for i_id in ids:
-            merge_ship_instances(i_id)
-        results = set(TOTAL_INSTANCES[ids[0]].confirmed_ships)
-        for i_id in ids[1:]:
-            results.intersection_update(TOTAL_INSTANCES[i_id].confirmed_ships)
-        if results:
-            #print(f"Merging ships upon agreed-instances at depth {len(start)-1}, instance id {start} now has addtl. confirmed ship(s) {results}")
-            for ship in results:
-                main.confirmed_ships.add(ship)
-                start, direction, ship_size = ship
-                x, y = start
-                match direction:
-                    case (-1, 0):
-                        main.game_state[x-ship_size+1:x+1, y] = 3
-                        if start=='1': GAME_BOARD[x-ship_size+1:x+1, y] = 3
-                    case (0, -1):
-                        main.game_state[x, y-ship_size+1:y+1] = 3
-                        if start=='1': GAME_BOARD[x, y-ship_size+1:y+1] = 3
-                    case (1, 0):
-                        main.game_state[x:x+ship_size, y] = 3
-                        if start=='1': GAME_BOARD[x:x+ship_size, y] = 3
-                    case (0, 1):
-                        main.game_state[x, y:y+ship_size] = 3
-                        if start=='1': GAME_BOARD[x, y:y+ship_size] = 3
-
-def print_board():
+# live hypotheses above which the auto engine switches to sampling
+MAX_INSTANCES = 64
+# hard bound on the hypothesis tree; past it the least likely new hypotheses are dropped
+MAX_TREE_NODES = 4096
+SAMPLES = 2000
+
+################################################################################
+# Prints the distribution of game moves and the mean for a move histogram.     #
+################################################################################
+def print_results(results):
+    rounds = sum(results)
+    expectedMoves = 0
+    print(f"{colors.BLUE + colors.BOLD}In {rounds} simulations, here is the distribution of game moves:")
+    for i in range(len(results)):
+        if results[i] == 0: continue
+        print(f"{colors.GREEN}{i} moves: {results[i]} game(s)")
+        expectedMoves += i * results[i] / rounds
+        
+    print(f"{colors.BLUE + colors.BOLD}The number of mean moves was {colors.YELLOW}{expectedMoves}.")
+
+################################################################################
+# Evaluates a stack of boards in one vectorized pass, the same way             #
+# Solution.eval_state evaluates a board without hypothesis instances.          #
+# game_states: (N, board_size, board_size) array of game states.               #
+# fleets:      N iterables of the sizes of the ships left in every game.       #
+# Returns the (N, board_size, board_size) probability maps and the (N, 2)      #
+# array of best moves. Boards with no ship left to find, or no room left for   #
+# one, get an all-zero map and the move (-1, -1).                              #
+################################################################################
+def eval_states(game_states, fleets):
+    game_states = np.asarray(game_states)
+    # an empty batch has nothing to evaluate (and a plain [] no board size)
+    if len(game_states) == 0:
+        board_size = game_states.shape[-1] if game_states.ndim == 3 else BOARD_SIZE
+        return np.zeros((0, board_size, board_size)), np.zeros((0, 2), dtype=int)
+    board_size = game_states.shape[-1]
+    ship_sizes = tuple(sorted(set(ship_size for fleet in fleets for ship_size in fleet)))
+    counts = fleet_counts(fleets, ship_sizes)
+
+    p = fleet_density(game_states, ship_sizes, counts).astype(float)
+
+    # any already hit points cannot be hit again
+    hits = game_states == 2
+    p[hits] = 0
+
+    # normalize every map to the number of unfound hit points of its game
+    unfound_hit_points = counts.dot(np.array(ship_sizes, dtype=np.int64)) - hits.sum(axis=(1, 2))
+    totals = p.sum(axis=(1, 2))
+    # a finished game (or one with no placement left) still in the batch gets an empty map and no move
+    live = (unfound_hit_points > 0) & (totals > 0)
+    p[live] *= (unfound_hit_points[live] / totals[live])[:, None, None]
+    p[~live] = 0
+
+    best_moves = np.stack(np.divmod(p.reshape(len(p), board_size * board_size).argmax(axis=1), board_size), axis=1)
+    best_moves[~live] = -1
+    return p, best_moves
+
+################################################################################
+# GAME CLASS: Self-contained context for one game played by the solver. Every  #
+# Solution instance of a game refers back to its Game, so any number of games  #
+# can be interleaved in one process or played from a thread pool.              #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - board:      The Board the game is played on.                               #
+# - board_size: The width and height of the board (from the Board).            #
+# - ship_sizes: The sizes of the ships of the fleet (from the Board).          #
+# - game_board: The confirmed results of the game, same values as game_state.  #
+# - solution:   The root Solution instance (id 1), the root of the hypothesis  #
+#               tree.                                                          #
+# - max_nodes:  Bound on the number of Solution instances in the tree.         #
+# - next_id:    The id the next hypothesis gets.                               #
+# - created, pruned, peak: Hypotheses created, hypotheses dropped with their   #
+#               subtrees, and the largest the tree has been (see tree_stats).  #
+# - cache:      TranspositionTable of state counts. Pass one in to share it    #
+#               between games; counts only depend on the position.             #
+# - book:       Optional OpeningBook consulted before the first hit (exact     #
+#               evaluation only).                                              #
+# - engine:     'exact' for the hypothesis tree, 'sampled' for the posterior   #
+#               sampler, 'auto' to start exact and switch to sampling for the  #
+#               rest of the game once a sink makes the tree too deep.          #
+# - sampled:    True once the game evaluates by sampling.                      #
+# - samples:    Sample budget of every sampled evaluation.                     #
+# - time_budget: Optional seconds every sampled evaluation may take.           #
+# - rng:        Generator the sampler draws from.                              #
+# - history:    (x, y, result) of every shot, in order.                        #
+# - move_budget: Optional seconds every move may take. Past the deadline,      #
+#               hypotheses are cut off (likeliest first), counts estimated and #
+#               sampling stopped, and the move is flagged degraded.            #
+# - deadline:   time.perf_counter() deadline of the current move, or None.     #
+# - degraded:   True if the current move has cut any work short.               #
+# - estimates:  Number of counts estimated past a deadline, so count_states    #
+#               can tell which counts must not be cached.                      #
+# - metrics:    Optional Metrics (battleship_scripts/metrics.py) that counts   #
+#               and times the hot paths and traces every move; shared with the #
+#               Board and every Solution. None costs one lookup per call.      #
+# - targeting:  'probability' to shoot the likeliest cell, 'information' to    #
+#               shoot the cell whose outcome (miss, hit or sink) is the most   #
+#               uncertain, the largest expected information gain.              #
+################################################################################
+class Game():
+
+    ############################################################################
+    # Initiates the game with a fresh root Solution for the given board.       #
+    ############################################################################
+    def __init__(self, board, cache=None, book=None, engine='auto', samples=SAMPLES, time_budget=None, rng=None,
+                 move_budget=None, max_nodes=MAX_TREE_NODES, metrics=None, targeting='probability'):
+        self.board = board
+        self.metrics = metrics
+        board.metrics = metrics
+        self.board_size = board.board_size
+        self.ship_sizes = list(board.ship_sizes)
+        self.cache = TranspositionTable() if cache is None else cache
+        self.book = book
+        self.engine = engine
+        self.sampled = engine == 'sampled'
+        self.samples = samples
+        self.time_budget = time_budget
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.history = []
+        self.move_budget = move_budget
+        self.deadline = None
+        self.degraded = False
+        self.estimates = 0
+        self.game_board = np.zeros((self.board_size, self.board_size), dtype=int)
+        self.max_nodes = max_nodes
+        self.targeting = targeting
+        self.next_id = 2
+        self.created = 0
+        self.pruned = 0
+        self.peak = 1
+        self.solution = Solution(self, State.empty(self.ship_sizes, self.board_size))
+
+    ############################################################################
+    # Plays the game to the end and returns the number of moves.               #
+    ############################################################################
+    def run(self, verbose=True):
+        return self.solution.run(verbose)
+
+    ############################################################################
+    # Starts the clock of a move that began at start (a time.perf_counter()    #
+    # value).                                                                  #
+    ############################################################################
+    def start_move(self, start):
+        self.deadline = None if self.move_budget is None else start + self.move_budget
+        self.degraded = False
+
+    ############################################################################
+    # True once the deadline of the current move has passed.                   #
+    ############################################################################
+    def out_of_time(self):
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    ############################################################################
+    # Returns every placement covering the lowest hit cell of the state that   #
+    # may be a ship, as (mask, ship_size) pairs. Exactly one ship of a         #
+    # consistent fleet covers that cell, so branching on these alone counts    #
+    # every fleet once (branching on every hit would count it once for every   #
+    # order its ships covering hits can be picked in).                         #
+    ############################################################################
+    def ghost_ships(self, state):
+        game_state = state.array()
+        cell = (state.hit & -state.hit).bit_length() - 1
+        ghosts = []
+        for ship_size in state.fleet:
+            placements = get_placements(ship_size, state.board_size)
+            # a ghost location may not collide with missing or sunk, and must cover the hit point
+            candidates = placements.valid(game_state) & (placements.indices == cell).any(axis=1)
+            ghosts += [(placements.masks[i], ship_size) for i in np.flatnonzero(candidates)]
+        return ghosts
+
+    ############################################################################
+    # Returns the rough number of leaves of the ghost ship recursion of a hit  #
+    # mode state. Every level sinks one ship and covers at least one hit, so   #
+    # it is at most min(hits, ships) deep.                                     #
+    ############################################################################
+    def ghost_leaves(self, state):
+        return len(self.ghost_ships(state)) ** min(state.hit_count(), len(state.fleet))
+
+    ############################################################################
+    # True if the hypothesis tree is too deep to evaluate exactly: too many    #
+    # live hypotheses, or one with too many ghost ships to count recursively.  #
+    ############################################################################
+    def too_deep(self):
+        if self.solution.size > MAX_INSTANCES:
+            return True
+        for instance in self.solution.walk():
+            if instance.instances_created() or not instance.state.hit:
+                continue
+            if self.ghost_leaves(instance.state) > max_ghost_leaves(instance.state.board_size):
+                return True
+        return False
+
+    ############################################################################
+    # Switches the game to sampled evaluation: drops every hypothesis and      #
+    # rebuilds the root state from the history.                                #
+    ############################################################################
+    def use_sampling(self):
+        self.sampled = True
+        root = self.solution
+        for instance in list(root.instances.keys()):
+            root.remove_instance(instance)
+        root.state = self.history_state()
+
+    ############################################################################
+    # Returns the State of every shot of the history applied to an empty board #
+    # (hits stay hits after their ship sinks).                                 #
+    ############################################################################
+    def history_state(self):
+        state = State.empty(self.ship_sizes, self.board_size)
+        for x, y, result in self.history:
+            state = state.shoot(x, y, result)
+        return state
+
+    ############################################################################
+    # Returns the size of the hypothesis tree: live, peak, created and pruned  #
+    # instances, and the bytes held by their density trackers.                 #
+    ############################################################################
+    def tree_stats(self):
+        tracker_bytes = 0
+        for instance in self.solution.walk():
+            if instance.tracker is not None:
+                tracker = instance.tracker
+                tracker_bytes += tracker.blocked.nbytes + tracker.hits.nbytes + tracker.size_maps.nbytes
+        return {'live': self.solution.size, 'peak': self.peak, 'created': self.created,
+                'pruned': self.pruned, 'tracker_bytes': tracker_bytes}
+
+    ############################################################################
+    # Returns the number of fleets consistent with a state. In hit mode, every #
+    # placement covering the lowest hit is tried as a ghost ship and the       #
+    # counts of the resulting states are summed. Results are memoized in the   #
+    # cache under the canonical key as well, so rotated and mirrored positions #
+    # share counts; the cheaper exact key is tried first. Positions whose      #
+    # enumeration would go over MAX_WORK (the full fleet, big boards) are      #
+    # estimated by count_fleets, and counts estimated past the deadline are    #
+    # not cached, nor is anything counted from them.                           #
+    ############################################################################
+    @timed('count_states')
+    def count_states(self, state):
+        key = state.key()
+        total = self.cache.get(key)
+        if total is not None:
+            return total
+        symmetric_key = canonical_key(state)
+        total = self.cache.get(symmetric_key)
+        if total is not None:
+            self.cache.put(key, total)
+            return total
+        if self.metrics is not None:
+            self.metrics.count('states_enumerated')
+
+        # if hit mode, cover with ghost ship and recursively generate cases
+        if state.hit:
+            if self.out_of_time():
+                # estimated for this move only, so a later move can still count it exactly
+                self.degraded = True
+                self.estimates += 1
+                return estimate_fleets(state.array(), state.fleet, state.board_size)
+            if self.ghost_leaves(state) > max_ghost_leaves(state.board_size):
+                # too many branches to recurse (big boards and fleets), estimate instead
+                total = estimate_fleets(state.array(), state.fleet, state.board_size)
+            else:
+                # find every point in the ship and temp set as sunk, then count the ghost state
+                # stays 0 in the impossible case of hit points left with all ships sunk
+                estimates = self.estimates
+                total = 0
+                for mask, ship_size in self.ghost_ships(state):
+                    total += self.count_states(state.sink(mask, ship_size))
+                if self.estimates != estimates:
+                    return total
+        else:
+            # otherwise count every non-overlapping fleet that fits around the misses and sinks
+            total = count_fleets(state.array(), state.fleet, state.board_size, MAX_WORK)
+
+        self.cache.put(symmetric_key, total)
+        if key != symmetric_key:
+            self.cache.put(key, total)
+        return total
+
+    ############################################################################
+    # Confirms the ships that every child instance of node (the root if None)  #
+    # agrees on, children first, so the whole subtree is walked once.          #
+    ############################################################################
+    @timed('merge_ship_instances')
+    def merge_ship_instances(self, node=None):
+        node = self.solution if node is None else node
+        children = list(node.instances.keys())
+        if children:
+            for child in children:
+                self.merge_ship_instances(child)
+            results = set(children[0].confirmed_ships)
+            for child in children[1:]:
+                results.intersection_update(child.confirmed_ships)
+            if results:
+                #print(f"Merging ships upon agreed-instances at depth {node.instance_depth}, instance id {node.id} now has addtl. confirmed ship(s) {results}")
+                for ship in results:
+                    node.confirmed_ships.add(ship)
+                    cells = ship_cells(*ship, self.board_size)
+                    node.state = node.state.confirm(sum(1 << cell for cell in cells))
+                    if node is self.solution: self.game_board.flat[cells] = 3
+
+    def print_board(self):
         string = 'INSTANCE STRUCTURE\n'
-        for id in sorted(list(TOTAL_INSTANCES.keys())):
-            string += '-' * len(id) + f'> {id} (CONFIRMED SINKS: {TOTAL_INSTANCES[str(id)].confirmed_ships})\n'
-        string += f'TOTAL SHIPS SUNK: {TOTAL_INSTANCES["1"].ships_sunk}'
+        for instance in self.solution.walk():
+            string += '-' * (instance.instance_depth + 1) + f'> {instance.id} (CONFIRMED SINKS: {instance.confirmed_ships})\n'
+        string += f'TOTAL SHIPS SUNK: {self.solution.ships_sunk}'
         print(string)
 
 ################################################################################
@@ -58,22 +330,20 @@ def print_board():
 # - board:   Stores the Board class that the game runs on.                     #
 # - counter: Counts the number of moves the player has made.                   #
 # - win:     True if player has won. Terminates the game.                      #
+# - results: Histogram of the number of moves per game, one entry for every    #
+#            possible count from 0 to board_size ** 2.                         #
 ################################################################################
 class Battleship():
 
     ############################################################################
     # Runs the Battleship game.                                                #
     ############################################################################
-    def __init__(self, generate_random, games=3):
-        self.board = Board(generate_random)
-        self.solution = Solution(self.board)
-        global TOTAL_INSTANCES
-        global GAME_BOARD 
-        GAME_BOARD = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
-        TOTAL_INSTANCES = {}
-
-        TOTAL_INSTANCES[str(self.solution.id)] = self.solution
-        self.results = np.zeros(100, dtype=int)
+    def __init__(self, generate_random, games=3, book=None, board_size=BOARD_SIZE, ship_sizes=DEFAULT_SHIP_SIZES):
+        self.board = Board(generate_random, board_size=board_size, ship_sizes=ship_sizes)
+        self.book = book
+        self.game = Game(self.board, book=self.book)
+        self.solution = self.game.solution
+        self.results = np.zeros(board_size * board_size + 1, dtype=int)
         self.rounds = games
 
         for i in range(self.rounds):
@@ -82,27 +352,18 @@ class Battleship():
             self.results[result] += 1
             self.board.reset()
             self.board.generate()
-            self.solution = Solution(self.board)
-            GAME_BOARD = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
-            TOTAL_INSTANCES = {}
-            TOTAL_INSTANCES[str(self.solution.id)] = self.solution
+            self.game = Game(self.board, book=self.book)
+            self.solution = self.game.solution
         
         # analyze stats
-        expectedMoves = 0
-        print(f"{colors.BLUE + colors.BOLD}In {self.rounds} simulations, here is the distribution of game moves:")
-        for i in range(100):
-            if self.results[i] == 0: continue
-            print(f"{colors.GREEN}{i} moves: {self.results[i]} game(s)")
-            expectedMoves += i * self.results[i] / self.rounds
-            
-        print(f"{colors.BLUE + colors.BOLD}The number of mean moves was {colors.YELLOW}{expectedMoves}.")
+        print_results(self.results)
         
         # print for google sheets formatting
         printSheet = ""
         while (len(printSheet) != 1) and (printSheet != "y" and printSheet != "n"):
             printSheet = str.lower(input(f"{colors.BLUE + colors.BOLD}Would you like to print the list for spreadsheet formatting? Press Y for yes, N for no. First starts at 0. "))
         if printSheet == "y":
-            for i in range(100):
+            for i in range(len(self.results)):
                 print(self.results[i])
             
         print(f"{colors.BLUE + colors.BOLD}The number of moves was {colors.YELLOW}{result}.")
@@ -111,16 +372,26 @@ class Battleship():
     # Plays one game in auto mode.                                             #
     ############################################################################
     def playAuto(self):
-        return self.solution.run()
+        return self.game.run()
     
 ################################################################################
 # SOLUTION CLASS:                                                              #
 # ---------------------------------------------------------------------------- #
 # CONSTANTS                                                                    #
+# - game: The Game this instance belongs to                                    #
 # - board: A Board object                                                      #
-# - instances: Instances of solutions created when sunk                        #
-# - remaining_ships: List of the sizes of remaining ships                      #
-# - game_state: An array storing values of the board.                          #
+# - instances: Child hypotheses created when sunk, with their number of states #
+# - parent: The instance this hypothesis branched off, None for the root.      #
+# - ship: (x, y, orientation, ship_size) of the ship this hypothesis assumes   #
+#   sunk, from its top left corner.                                            #
+# - copies: Number of ships of the fleet that ship could be (equal sizes). A   #
+#   hypothesis stands for all of them, so its count is multiplied by copies.   #
+# - size: Number of instances in the subtree rooted here, itself included.     #
+# - state: Immutable State with the miss/hit/sunk bitmasks and the remaining   #
+#   fleet. Hypotheses share it with their parent instead of copying arrays.    #
+# - remaining_ships: List of the sizes of remaining ships (from state)         #
+# - tracker: DensityTracker of the position, created on the first evaluation.  #
+# - game_state: An array storing values of the board (expanded from state).    #
 #    - 0: not tried                                                            #
 #    - 1: missed                                                               #
 #    - 2: hit                                                                  #
@@ -131,134 +402,210 @@ class Solution():
     ############################################################################
     # Initiates the solution instance.                                         #
     ############################################################################
-    def __init__(self, board, game_state=np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int), remaining_ships=DEFAULT_SHIP_SIZES, instance_depth=0, id=1):
-        self.board = board
+    def __init__(self, game, state=None, instance_depth=0, id=1):
+        self.game = game
+        self.board = game.board
+        self.metrics = game.metrics
         self.instances = defaultdict(lambda: 0)
+        self.parent = None
+        self.ship = None
+        self.copies = 1
+        self.size = 1
         self.id = id
-        self.remaining_ships = remaining_ships
-        self.game_state = game_state
+        self.state = State.empty(game.ship_sizes, game.board_size) if state is None else state
+        self.array_state = None
+        self.tracker = None
+        self.posterior = None
         self.move_count = 0
+        self.move_times = []
+        self.move_degraded = []
         self.eval_on = True
         self.ships_sunk = 0
         self.instance_depth = instance_depth
         self.confirmed_ships = set()
+
+    ############################################################################
+    # The game state array, expanded from the state only when it changed.      #
+    ############################################################################
+    @property
+    def game_state(self):
+        if self.array_state is not self.state:
+            self.array = self.state.array()
+            self.array_state = self.state
+        return self.array
+
+    @property
+    def remaining_ships(self):
+        return list(self.state.fleet)
+
+    ############################################################################
+    # The density of the position for the remaining ships. The tracker is      #
+    # brought up to date with whatever changed the state since the last call   #
+    # (shots, sinks, collapsed hypotheses), which only touches the placements  #
+    # covering the changed cells.                                              #
+    ############################################################################
+    def density(self):
+        if self.tracker is None:
+            self.tracker = DensityTracker(sorted(set(self.game.ship_sizes)), self.state.board_size)
+        self.tracker.update(self.state.miss, self.state.hit, self.state.sunk)
+        return self.tracker.density(self.state.fleet)
         
+    ############################################################################
+    # Yields this instance and every instance below it, parents first.         #
+    ############################################################################
+    def walk(self):
+        stack = [self]
+        while stack:
+            instance = stack.pop()
+            yield instance
+            stack.extend(reversed(list(instance.instances.keys())))
+
+    ############################################################################
+    # Adds the change in the number of instances below to every ancestor.      #
+    ############################################################################
+    def resize(self, change):
+        instance = self
+        while instance is not None:
+            instance.size += change
+            instance = instance.parent
+
+    ############################################################################
+    # Links a child hypothesis (with its subtree) under this instance.         #
+    ############################################################################
+    def add_instance(self, instance, total_states):
+        instance.parent = self
+        self.instances[instance] = total_states
+        self.resize(instance.size)
+        self.game.peak = max(self.game.peak, self.game.solution.size)
+
+    ############################################################################
+    # Unlinks a child hypothesis. Its whole subtree goes with it, whatever its #
+    # size; only the ancestors' sizes are updated.                             #
+    ############################################################################
+    def remove_instance(self, instance):
+        del self.instances[instance]
+        instance.parent = None
+        self.resize(-instance.size)
+
+    @timed('clean_instances')
     def clean_instances(self):
         for k in list(self.instances.keys()):
             if self.instances[k] == 0:
-                for i_id in list(TOTAL_INSTANCES.keys()):
-                    if i_id.startswith(str(k.id)):
-                        del TOTAL_INSTANCES[i_id]
-                del self.instances[k]
+                self.game.pruned += k.size
+                self.remove_instance(k)
 
         # if there is only 1 viable instance left, collapse the instance
         if len(self.instances) == 1:
-            instance = self.instances.popitem()[0]
-            del TOTAL_INSTANCES[str(instance.id)]
+            instance = next(iter(self.instances))
+            self.remove_instance(instance)
             #print(f"ID: {self.id} | Collapsing instance id {instance.id} because only 1 possibility remains at depth {self.instance_depth}")
             #print(f"ID: {self.id} | Collapsed instance has game board")
             #print(DataFrame(instance.game_state))
             
-            # collect the true ship size that was sunk in this instance
-            ship_size = [s for s in self.remaining_ships if s not in instance.remaining_ships][0]
-            
-            self.remaining_ships = instance.remaining_ships
-            self.game_state = instance.game_state
+            self.state = instance.state
+            self.copies *= instance.copies
 
-            #print(f"ID: {self.id} | Ship confirmed sunk of size {ship_size} facing {self.sunken_dir} starting from {self.sunken_start} | Remaining ships {self.remaining_ships} at instance depth {self.instance_depth}")
+            #print(f"ID: {self.id} | Ship confirmed sunk {instance.ship} | Remaining ships {self.remaining_ships} at instance depth {self.instance_depth}")
 
             # add to confirmed ships to check with other instances
-            self.confirmed_ships.add((self.sunken_start, self.sunken_dir, ship_size))
+            self.confirmed_ships.add(instance.ship)
 
             # if the instance contains subinstances, add it back into here
             # do not update instance depth; this accounts for ships left
             if instance.instances_created():
-                for subinstance, poss in instance.instances.items():
-                    self.instances[subinstance] = poss
+                for subinstance, poss in list(instance.instances.items()):
+                    instance.remove_instance(subinstance)
+                    self.add_instance(subinstance, poss)
                     
-        merge_ship_instances()
+        # merging walks the whole instance tree, so only the root does it
+        if self.instance_depth == 0:
+            self.game.merge_ship_instances()
         
+    @timed('get_total_states')
     def get_total_states(self):
         # if instances are created, total is the sum of all of them
         if self.instances_created():
-            return sum(self.instances.values())
-
-        # if hit mode, cover with ghost ship and recursively generate cases
-        if self.in_hit_mode():
-            # impossible case; cannot still have hit points and have all ships sunk
-            if self.instance_depth == len(DEFAULT_SHIP_SIZES):
-                return 0
-            total = 0
-            for ship_size in self.remaining_ships:
-                for pos in range(BOARD_SIZE):
-                    for length in range(BOARD_SIZE - ship_size + 1):
-                        # if the ship collides with missing or sunk, then it is not a valid location
-                        if any(value in (1, 3) for value in self.game_state[pos,length:length+ship_size]): pass
-                        # if it collides with hit point, it is a valid location
-                        elif any(value == 2 for value in self.game_state[pos,length:length+ship_size]):
-                            game_state = copy.deepcopy(self.game_state)
-                            remaining_ships = copy.deepcopy(self.remaining_ships)
-                            board = copy.deepcopy(self.board)
-                            remaining_ships.remove(ship_size)
-                            # find every point in the ship and temp set as sunk
-                            game_state[pos, length:length + ship_size] = 3
-                            # find total states of a ghost solution instance with depth+1, add to the total
-                            weight = Solution(board, game_state, remaining_ships, self.instance_depth + 1).get_total_states()
-                            total += weight
-                            
-                        # do the same for the other orientation
-                        if any(value in (1, 3) for value in self.game_state[length:length+ship_size,pos]): pass
-                        elif any(value == 2 for value in self.game_state[length:length+ship_size,pos]):
-                            game_state = copy.deepcopy(self.game_state)
-                            remaining_ships = copy.deepcopy(self.remaining_ships)
-                            board = copy.deepcopy(self.board)
-                            remaining_ships.remove(ship_size)
-                            game_state[length:length + ship_size, pos] = 3
-                            weight = Solution(board, game_state, remaining_ships, self.instance_depth + 1).get_total_states()
-                            total += weight
-            return total
+            return self.copies * sum(self.instances.values())
 
-        total = 1
-        # otherwise multiply together as normal
-        for ship_size in self.remaining_ships:
-            counter = 0
-            for pos in range(BOARD_SIZE):
-                for length in range(BOARD_SIZE - ship_size + 1):
-                    # if the ship only collides with hit or not tried, then it is valid location
-                    if all(value in (0, 2) for value in self.game_state[pos,length:length+ship_size]): 
-                        counter += 1
-                    if all(value in (0, 2) for value in self.game_state[length:length+ship_size,pos]): 
-                        counter += 1
-            total *= counter
-        return total
+        # otherwise it only depends on the position
+        return self.copies * self.game.count_states(self.state)
     
-    def run(self):
+    ############################################################################
+    # Plays until every ship is sunk and returns the number of moves.          #
+    # verbose: False to skip printing the boards (headless simulation).        #
+    # The time taken by every move is appended to move_times, and whether it   #
+    # ran out of its move budget (see Game) to move_degraded.                  #
+    ############################################################################
+    def run(self, verbose=True):
         while not self.check_win():
             self.move_count += 1
+            start = time.perf_counter()
+            self.game.start_move(start)
             
-            p = self.eval_state()
-            best_move = unravel_index(p.argmax(), p.shape)
+            # before the first hit the position may be in the opening book, which holds the moves of exact play
+            entry = None
+            if (self.game.book is not None and not self.instances_created() and not self.game.sampled
+                    and self.game.targeting == 'probability'):
+                entry = self.game.book.lookup(self.state)
+            if entry is not None:
+                p, best_move = entry
+            else:
+                p = self.eval_state()
+                best_move = unravel_index(p.argmax(), p.shape)
             
-            print(f"Move #{self.move_count} | ID: {self.id} | Depth {self.instance_depth} | Executing best move {best_move}.")
-            #print(f"ID: {self.id} | Probability Matrix:")
-            print(DataFrame(p))
-            #print(f"ID: {self.id} | Board State:")
-            print(DataFrame(GAME_BOARD))
-            #print_board()
+            if verbose:
+                print(f"Move #{self.move_count} | ID: {self.id} | Depth {self.instance_depth} | Executing best move {best_move}.")
+                #print(f"ID: {self.id} | Probability Matrix:")
+                print(DataFrame(p))
+                #print(f"ID: {self.id} | Board State:")
+                print(DataFrame(self.game.game_board))
+                #self.game.print_board()
             
             # execute move; check for win
-            if self.move(best_move) == -1:
+            result = self.move(best_move)
+            self.move_times.append(time.perf_counter() - start)
+            self.move_degraded.append(self.game.degraded)
+            if self.metrics is not None:
+                self.metrics.end_move(self.game, self.move_times[-1])
+            if result == -1:
+                if self.metrics is not None:
+                    self.metrics.end_game()
                 return self.move_count
+
+            # a sink may leave too many hypotheses to evaluate exactly, and a move that ran
+            # out of time will not get cheaper; sampling stays within the budget from here on
+            if self.game.engine == 'auto' and not self.game.sampled:
+                if self.game.degraded or (self.game.history[-1][2] == 'S' and self.game.too_deep()):
+                    self.game.use_sampling()
             
         return self.move_count
         
+    ############################################################################
+    # Returns the map whose largest cell is the best shot, by the targeting of #
+    # the game (see Game).                                                     #
+    ############################################################################
+    @timed('eval_state')
     def eval_state(self):
+        if self.game.targeting == 'information' and self.instance_depth == 0:
+            return self.information_state()
+        return self.probability_state()
+
+    ############################################################################
+    # Returns the map of the expected number of ships on every cell.           #
+    ############################################################################
+    def probability_state(self):
+        # sampled games take the posterior of the sampler, unless it found no consistent fleet
+        if self.game.sampled:
+            p = self.sample_state()
+            if p is not None:
+                return p
+
         # remove any non-needed instances
         self.clean_instances()
 
-        unfound_hit_points = sum(self.remaining_ships) - np.count_nonzero(self.game_state == 2)
+        unfound_hit_points = sum(self.state.fleet) - self.state.hit_count()
 
-        p = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=float)
+        p = np.zeros((self.state.board_size, self.state.board_size), dtype=float)
 
         # if there are instances, iterate through all and sum together
         if self.instances_created():
@@ -269,22 +616,25 @@ class Solution():
 
             weights = {list(self.instances.keys())[i] : w[i] for i in range(len(w))}
             
-            for instance in self.instances.keys():
+            # against a deadline, the likeliest hypotheses go first so a cut-off drops the least weight
+            instances = list(self.instances.keys())
+            if self.game.deadline is not None:
+                instances.sort(key=lambda instance: weights[instance], reverse=True)
+
+            for instance in instances:
+                # out of time: the hypotheses evaluated so far stand for all of them
+                if instance is not instances[0] and self.game.out_of_time():
+                    self.game.degraded = True
+                    break
                 # add the weighted probability of the instance evaluation output
                 p += weights[instance] * instance.eval_state()
             
             # return finalized normalized probabilities
             return p / sum(sum(p)) * unfound_hit_points
         
-        for ship_size in self.remaining_ships:
-            for pos in range(BOARD_SIZE):
-                for length in range(BOARD_SIZE - ship_size + 1):
-                    # if the ship only collides with hit or not tried, then it is valid location; increment 1 at each location
-                    if all(value in (0, 2) for value in self.game_state[pos,length:length+ship_size]):
-                        # grant heavy weighting based on how many hit points it passes through + 1 for general
-                        p[pos, length:length+ship_size] += 50 * sum(self.game_state[pos,length:length+ship_size]) ** 2 + 1
-                    if all(value in (0, 2) for value in self.game_state[length:length+ship_size,pos]):
-                        p[length:length+ship_size, pos] += 50 * sum(self.game_state[length:length+ship_size,pos]) ** 2 + 1
+        # if the ship only collides with hit or not tried, then it is valid location; increment at each location
+        # grant heavy weighting based on how many hit points it passes through + 1 for general
+        p += self.density()
 
         # any already hit points cannot be hit again; setting point to 0             
         locations = np.where(self.game_state == 2)
@@ -293,6 +643,59 @@ class Solution():
         # return normalized matrix
         return p / sum(sum(p)) * unfound_hit_points
     
+    ############################################################################
+    # Runs the posterior sampler on the history of the game within the sample  #
+    # budget and the deadline, keeps the run in posterior and returns it.      #
+    ############################################################################
+    def run_sampler(self):
+        sampler = PosteriorSampler(self.game.board_size, self.game.ship_sizes, self.game.history)
+        deadline = None if self.game.time_budget is None else time.perf_counter() + self.game.time_budget
+        if self.game.deadline is not None:
+            deadline = self.game.deadline if deadline is None else min(deadline, self.game.deadline)
+        self.posterior = sampler.run(self.game.samples, deadline, self.game.rng)
+        if self.posterior.samples < self.game.samples:
+            self.game.degraded = True
+        return self.posterior
+
+    ############################################################################
+    # Returns the probability map of the posterior sampler for the history of  #
+    # the game, or None if no consistent fleet was drawn.                      #
+    # Only the ships drawn to cover hits are taken from the samples. The ships #
+    # drawn freely give a nearly flat map whose argmax would be mostly noise,  #
+    # so their part is the density of the likeliest free fleet instead, with   #
+    # every hit blocked (free ships never cover one), as in an exact game.     #
+    ############################################################################
+    def sample_state(self):
+        posterior = self.run_sampler()
+        if posterior.p is None or not posterior.fleet:
+            return posterior.p
+
+        # only sampled games get here, and their root keeps the whole position
+        state = self.state
+        if self.tracker is None:
+            self.tracker = DensityTracker(sorted(set(self.game.ship_sizes)), state.board_size)
+        self.tracker.update(state.miss, 0, state.sunk | state.hit)
+        free = self.tracker.density(posterior.fleet)
+        if free.sum() == 0:
+            return posterior.p
+        return posterior.target + free / free.sum() * posterior.free
+
+    ############################################################################
+    # Returns the expected information gain of a shot at every cell, in bits   #
+    # (see information.py). Both the occupancy and the sink probabilities are  #
+    # the marginals of the posterior sampler over the consistent fleets, in    #
+    # hunt mode too: the maps of the engines weigh placements by a heuristic   #
+    # and are not probabilities. If no consistent fleet is drawn, the map of   #
+    # the engine is used instead.                                              #
+    # A cell sure to be a hit gains nothing but still has to be shot, so cells #
+    # of equal gain go to the likelier one.                                    #
+    ############################################################################
+    def information_state(self):
+        posterior = self.run_sampler()
+        if posterior.p is None:
+            return self.probability_state()
+        return outcome_entropy(posterior.p, posterior.sink) + 1e-6 * posterior.p
+
     def move(self, move, result=''):
 
         #if self.instance_depth == 0:
@@ -301,7 +704,7 @@ class Solution():
         self.clean_instances()
 
         # if depth is exceeded and there are still hit points, the instance creation is impossible
-        if self.instance_depth == len(DEFAULT_SHIP_SIZES) and self.in_hit_mode():
+        if self.instance_depth == len(self.game.ship_sizes) and self.in_hit_mode():
             return 0
 
         x = move[0]
@@ -316,91 +719,94 @@ class Solution():
         if self.instance_depth == 0:
             match result:
                 case 'M':
-                    GAME_BOARD[x, y] = 1
+                    self.game.game_board[x, y] = 1
                     #print(colors.CYAN)
                 case 'H':
-                    GAME_BOARD[x, y] = 2
+                    self.game.game_board[x, y] = 2
                     #print(colors.GREEN)
                 case 'S':
-                    GAME_BOARD[x, y] = 3
+                    self.game.game_board[x, y] = 3
                     self.ships_sunk += 1
                     #print(colors.YELLOW)
+            self.game.history.append((x, y, result))
                     
         if self.check_win():
             return -1
 
+        # sampled games keep no hypotheses, only the position
+        if self.game.sampled:
+            self.state = self.state.shoot(x, y, result)
+            return 1
+
         # result must be applied to all instances. if no instances, this part is skipped
         for instance, total_cases in self.instances.items():
             if total_cases == 0: continue
             self.instances[instance] = instance.move(move, result)
         
-        if self.instances_created(): return sum(self.instances.values())
-        match result:
-            case 'M':
-                self.game_state[x, y] = 1
-            case 'H':
-                self.game_state[x, y] = 2
-            case 'S':
-                self.game_state[x, y] = 3
-
-                # search for squares next to it that are hit but not sunk
-                for direction in ((-1, 0), (0, -1), (1, 0), (0, 1)):
-                    coord = np.add(direction, move)
-                    if check_bounds(coord) and self.game_state[coord[0], coord[1]] == 2:
+        if self.instances_created(): return self.get_total_states()
+        self.state = self.state.shoot(x, y, result)
+        if result == 'S':
+            # the ship sunk here covers this cell and was hit on every other cell before. the cell may be
+            # either end of it or in the middle (hit on both sides first), and it may lie next to other hits
+            cell = int(x) * self.state.board_size + int(y)
+            # equal sizes give the same hypothesis, which is made once and counted for every copy
+            fleet = self.remaining_ships
+            for ship_size in sorted(set(fleet)):
+                placements = get_placements(ship_size, self.state.board_size)
+                for index in np.flatnonzero((placements.indices == cell).any(axis=1)):
+                    mask = placements.masks[index]
+                    if mask & ~self.state.hit & ~(1 << cell):
+                        continue
+                    instance = Solution(self.game, self.state.sink(mask, ship_size), self.instance_depth + 1, self.game.next_id)
+                    self.game.next_id += 1
+                    self.game.created += 1
+                    ship_x, ship_y = placements.starts[index]
+                    instance.ship = (int(ship_x), int(ship_y), int(placements.orientation[index]), ship_size)
+                    instance.copies = fleet.count(ship_size)
+                    # the hypothesis starts from the counts of its parent
+                    if self.tracker is not None:
+                        instance.tracker = self.tracker.copy()
+                    self.add_instance(instance, instance.get_total_states())
+            # if no new instances are created, it must be impossible state
+            if len(self.instances) == 0:
+                return 0
+            # past the bound on the tree, the least likely hypotheses go (but never the last one)
+            if self.game.solution.size > self.game.max_nodes:
+                for instance in sorted(self.instances, key=self.instances.get):
+                    if len(self.instances) == 1 or self.game.solution.size <= self.game.max_nodes:
                         break
-                # it may be possible that sink occurs at junction; in this case, move up before break statement and delete break statement
-                for ship_size in self.remaining_ships:
-                    coord_border = np.add(np.multiply(direction, ship_size-1), move)
-                    # valid ship orientation
-                    if check_bounds(coord_border) and self.game_state[coord_border[0], coord_border[1]] == 2:
-                        board = copy.deepcopy(self.board)
-                        game_state = copy.deepcopy(self.game_state)
-                        remaining_ships = copy.deepcopy(self.remaining_ships)
-                        remaining_ships.remove(ship_size)
-                        match direction:
-                            case (-1, 0):
-                                game_state[coord_border[0]:coord_border[0]+ship_size, y] = 3
-                            case (0, -1):
-                                game_state[x, coord_border[1]:coord_border[1]+ship_size] = 3
-                            case (1, 0):
-                                game_state[x:x+ship_size, y] = 3
-                            case (0, 1):
-                                game_state[x, y:y+ship_size] = 3
-                        id = self.id * 10 + len(self.instances) + 1
-                        instance = Solution(board, game_state, remaining_ships, self.instance_depth + 1, id)
-                        self.instances[instance] = instance.get_total_states()
-                        TOTAL_INSTANCES[str(id)] = instance
-
-                        self.sunken_start = move
-                        self.sunken_dir = direction
-                # if no new instances are created, it must be impossible state
-                if len(self.instances) == 0:
-                    return 0
-                self.clean_instances()
+                    self.game.pruned += instance.size
+                    self.game.degraded = True
+                    self.remove_instance(instance)
+            self.clean_instances()
+
+        # only hypotheses are weighted by their number of states; nothing reads the root's count
+        if self.instance_depth == 0:
+            return 1
 
         total_states = self.get_total_states()
         return total_states
 
     def check_win(self):
-        return self.ships_sunk == len(DEFAULT_SHIP_SIZES)
+        return self.ships_sunk == len(self.game.ship_sizes)
     
     def instances_created(self):
         return len(self.instances) > 1
 
     def in_hit_mode(self):
-        return 2 in self.game_state
+        return self.state.hit != 0
         
 ################################################################################
 # BOARD CLASS: Stores the game state with both the actual ship allocation and  #
 # the guessed state.                                                           #
 # ---------------------------------------------------------------------------- #
-# CONSTANTS                                                                    #
-# - BOARD_SIZE: The size of the allocated board.                               #
-# - DEFAULT_SHIP_SIZES: The sizes of the ships available to allocate.          #
-# ---------------------------------------------------------------------------- #
 # INSTANCE VARIABLES:                                                          #
+# - board_size:     The width and height of the board (BOARD_SIZE by default). #
+# - ship_sizes:     The sizes of the ships to allocate (DEFAULT_SHIP_SIZES by  #
+#                   default).                                                  #
 # - hiddenState:    The array that stores the actual allocation. 0 indicates   #
-#                   nothing. 1 indicates a ship exists there.                  #
+#                   nothing, i + 1 ship i of ships, and -(i + 1) a part of     #
+#                   ship i that has been hit.                                  #
 # - guessState:     The array that stores the guessed allocation. 0 indicates  #
 #                   possible/confirmed, 1 indicates missed/not possible.       #
 # - gameState:      The same thing as guessState, except 0 for not checked,    #
@@ -408,107 +814,130 @@ class Solution():
 # - probState:      Higher for more likely spots for ships.                    #
 # - ships:          The array that stores Ship objects.                        #
 # - generateRandom: True if the array is to be generated at random.            #
+# - rng:            The NumPy Generator used to place ships at random.         #
+# - metrics:        Optional Metrics timing move, set by the Game.             #
+# A move is one lookup in hiddenState and one decrement of the remaining       #
+# parts of the ship. Hypotheses never touch the board, so every Solution       #
+# shares the one of the Game instead of copying it.                            #
 ################################################################################
 class Board():
-    
+    __slots__ = ('generateRandom', 'metrics', 'board_size', 'ship_sizes', 'rng', 'hiddenState', 'ships')
     
     ############################################################################
     # Initiates a board.                                                       #
+    # ships: Optional fixed ships as (size, x, y, orientation) tuples, e.g.    #
+    #        from a BoardCorpus, placed instead of generating the board.       #
     ############################################################################
-    def __init__(self, generateRandom):
+    def __init__(self, generateRandom, rng=None, board_size=BOARD_SIZE, ship_sizes=DEFAULT_SHIP_SIZES, ships=None):
         self.generateRandom = generateRandom
+        self.metrics = None
+        self.board_size = board_size
+        self.ship_sizes = list(ship_sizes)
+        self.rng = np.random.default_rng() if rng is None else rng
 
         self.reset()
+        # fixed placement
+        if ships is not None:
+            self.place(ships)
         # random generation
-        if self.generateRandom:
+        elif self.generateRandom:
             self.generate()
         # manual generation
         else:
-            for ship in DEFAULT_SHIP_SIZES:
+            for ship in self.ship_sizes:
                 result = tuple(input(f"Input the coordinates and orientation for ship of size {ship} e.g. [xyo], [12h], [34v]: "))
                 
                 x = int(result[0])
                 y = int(result[1])
                 o = 0
                 if result[2] == 'v': o = 1
-                
-                if o == 0:
-                    self.hiddenState[x,y:y+ship] = 1
-                else:
-                    self.hiddenState[x:x+ship,y] = 1
-                self.ships.append(Ship(ship, x, y, o))
+                self.add_ship(ship, x, y, o)
 
     ############################################################################
     # Resets the board state.                                                  #
     # Clears hiddenState, guessState, ships                                    #
     ############################################################################
     def reset(self):
-        self.hiddenState = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
+        self.hiddenState = np.zeros((self.board_size, self.board_size), dtype=np.int16)
         self.ships = []
 
+    ############################################################################
+    # Adds a ship to ships and marks its cells with its id in hiddenState.     #
+    ############################################################################
+    def add_ship(self, shipSize, x, y, orientation):
+        self.ships.append(Ship(shipSize, x, y, orientation))
+        if orientation == 0:
+            self.hiddenState[x,y:y+shipSize] = len(self.ships)
+        else:
+            self.hiddenState[x:x+shipSize,y] = len(self.ships)
+
     ############################################################################
     # Generates an orientation of ships by random. Only used after a reset.    #
     # adjacent: True if ships may touch. False if ships cannot.                #
     ############################################################################
     def generate(self):
-        for shipSize in DEFAULT_SHIP_SIZES:
+        for shipSize in self.ship_sizes:
             while True:
-                orientation = np.random.randint(2)
+                orientation = self.rng.integers(2)
                 
                 if orientation == 0:
-                    x = np.random.randint(BOARD_SIZE)
-                    y = np.random.randint(BOARD_SIZE - shipSize + 1)
+                    x = self.rng.integers(self.board_size)
+                    y = self.rng.integers(self.board_size - shipSize + 1)
                 else:
-                    x = np.random.randint(BOARD_SIZE - shipSize + 1)
-                    y = np.random.randint(BOARD_SIZE)
+                    x = self.rng.integers(self.board_size - shipSize + 1)
+                    y = self.rng.integers(self.board_size)
 
                 if not self.overlaps(x, y, orientation, shipSize):
-                    if orientation == 0:
-                        self.hiddenState[x,y:y+shipSize] = 1
-                    else:
-                        self.hiddenState[x:x+shipSize,y] = 1
                     break
-            self.ships.append(Ship(shipSize, x, y, orientation))
+            self.add_ship(shipSize, x, y, orientation)
+
+    ############################################################################
+    # Places the given (size, x, y, orientation) ships. Only used after a      #
+    # reset.                                                                   #
+    ############################################################################
+    def place(self, ships):
+        for shipSize, x, y, orientation in ships:
+            self.add_ship(shipSize, x, y, orientation)
 
     ############################################################################
     # Tests if a ship overlaps a given board.                                  #
     ############################################################################
     def overlaps(self, x, y, orientation, shipSize):
         if orientation == 0:
-            if sum(self.hiddenState[x,y:y+shipSize]) == 0: return False
-        else:
-            if sum(self.hiddenState[x:x+shipSize,y]) == 0: return False
-        return True
+            return self.hiddenState[x,y:y+shipSize].any()
+        return self.hiddenState[x:x+shipSize,y].any()
 
     ############################################################################
-    # Checks at (x,y) to see if a ship is hit.                                 #
+    # Checks at (x,y) to see if a ship is hit. A part already hit is not hit   #
+    # again, but still answers 'H' or 'S'.                                     #
     ############################################################################
+    @timed('board_move')
     def move(self, x, y):
+        index = int(self.hiddenState[x,y])
 
-        # if hit/sink
-        if self.hiddenState[x,y] == 1:
-            for ship in self.ships:
-                if ship.overlap(x,y):
-                    ship.hit(x,y)
-                    if not ship.sunk:
-                        return 'H'
-                    return 'S'
         # if miss
-        else:
+        if index == 0:
             return 'M'
+        # if hit/sink
+        ship = self.ships[abs(index) - 1]
+        if index > 0:
+            self.hiddenState[x,y] = -index
+            ship.remaining -= 1
+        if ship.remaining:
+            return 'H'
+        return 'S'
         
     def __str__(self):
 
         # board values
         string = f'''{colors.BOLD+colors.YELLOW+colors.UNDERLINE}    HIDDEN BOARD   '''
-        for row in range(BOARD_SIZE):
+        for row in range(self.board_size):
             string += f"{colors.RESET}\n"
-            for i in range(BOARD_SIZE):
-                match self.hiddenState[row,i]:
-                    case 0:
-                        string += f"{colors.BLUE}o "
-                    case 1:
-                        string += f"{colors.RED}x "
+            for i in range(self.board_size):
+                if self.hiddenState[row,i] == 0:
+                    string += f"{colors.BLUE}o "
+                else:
+                    string += f"{colors.RED}x "
                         
         return string
 
@@ -518,17 +947,22 @@ class Board():
 # INSTANCE VARIABLES:                                                          #
 # x, y: Coordinates of the top lerft corner of the ship.                       #
 # orientation: 0 = horizontal (along the y-axis), 1 = vertical (along x-axis)  #
+# remaining: Number of parts of the ship not hit yet (the Board counts down).  #
 # sunk: True if the ship is fully sunk.                                        #
-# partsHit: An array, 1 if the part of the ship has been hit, 0 otherwise      #
 ################################################################################
 class Ship():
+    __slots__ = ('size', 'x', 'y', 'orientation', 'remaining')
+
     def __init__(self, size, x, y, orientation):
         self.size = size
         self.x = x
         self.y = y
         self.orientation = orientation
-        self.sunk = False
-        self.partsHit = [0] * size
+        self.remaining = size
+
+    @property
+    def sunk(self):
+        return self.remaining == 0
 
     def __str__(self):
         return f'Ship of size {self.size} at ({self.x},{self.y}) facing direction {self.orientation}, sunk: {self.sunk}'
@@ -541,19 +975,7 @@ class Ship():
             return self.y <= y < self.y+self.size and self.x == x
         else:
             return self.x <= x < self.x+self.size and self.y  == y
-    
-    ############################################################################
-    # Updates instance variables when it is hit at the given coordinates.      #
-    # Doesn't check whether the x,y are valid. Make sure to precede with       #
-    # the overlap function.                                                    #
-    ############################################################################
-    def hit(self, x, y):
-        if self.orientation == 0:
-            self.partsHit[y - self.y] = 1
-        else:
-            self.partsHit[x - self.x] = 1
-        if sum(self.partsHit) == self.size:
-            self.sunk = True
+
 
 def run(numRounds):
     game = Battleship(generateRandom, numRounds)
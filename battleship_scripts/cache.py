@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from threading import Lock
+
+################################################################################
+# TRANSPOSITIONTABLE CLASS: Bounded LRU memo of solved positions.              #
+# ---------------------------------------------------------------------------- #
+# Keys are canonical state keys (State.key), values are whatever was computed  #
+# for that position. Once max_entries is reached the least recently used       #
+# entry is evicted. Safe to share between threads.                             #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - max_entries: Memory bound, in number of stored positions.                  #
+# - hits:        Lookups that found a stored value.                            #
+# - misses:      Lookups that did not.                                         #
+# - evictions:   Entries dropped to stay under max_entries.                    #
+################################################################################
+class TranspositionTable():
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.table = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    ############################################################################
+    # Returns the stored value for key and marks it recently used, or None.    #
+    ############################################################################
+    def get(self, key):
+        with self.lock:
+            value = self.table.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.table.move_to_end(key)
+            self.hits += 1
+            return value
+
+    ############################################################################
+    # Stores a value, evicting the least recently used entries if full.        #
+    ############################################################################
+    def put(self, key, value):
+        with self.lock:
+            self.table[key] = value
+            self.table.move_to_end(key)
+            while len(self.table) > self.max_entries:
+                self.table.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.table.clear()
+
+    ############################################################################
+    # Returns the counters as a dictionary.                                    #
+    ############################################################################
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.table),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,94 @@
+import numpy as np
+from battleship_scripts.placements import get_placements
+
+################################################################################
+# Uniform random fleets and board corpora.                                     #
+# ---------------------------------------------------------------------------- #
+# Board.generate places ships one after the other and retries a ship until it  #
+# fits, so the first ships are spread evenly and the later ones are pushed     #
+# into the gaps; fleets are not equally likely. Here every ship picks one of   #
+# its placements uniformly and independently, and the whole fleet is redrawn   #
+# if any two ships overlap. Every valid fleet (ships distinct, as in           #
+# counting.py) is then exactly equally likely. About 40% of draws are kept on  #
+# 10 x 10 with the default fleet, so boards are drawn in vectorized batches.   #
+#                                                                              #
+# A corpus stores boards as the placement index of every ship, into            #
+# get_placements(ship_size, board_size), in a NumPy structured array that is   #
+# read through a memory map. Like the opening book, every record also holds    #
+# the fleet (and the board size) it was drawn for.                             #
+################################################################################
+
+# fleets drawn per batch
+BATCH = 1 << 16
+
+################################################################################
+# Returns the structured dtype of the records of a corpus of the fleet.        #
+################################################################################
+def corpus_dtype(fleet):
+    return np.dtype([('placement', np.uint16, (len(fleet),)), ('fleet', np.uint8, (len(fleet),)),
+                     ('board_size', np.uint8)])
+
+################################################################################
+# Returns a (count, len(fleet)) array of placement indices of count fleets     #
+# drawn uniformly from every non-overlapping fleet on the board.               #
+################################################################################
+def sample_fleets(count, fleet, board_size, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    tables = [get_placements(ship_size, board_size) for ship_size in fleet]
+    sizes = np.array([len(table) for table in tables])
+    fleets = np.zeros((0, len(fleet)), dtype=np.uint16)
+    while len(fleets) < count:
+        # the batch grows with the rejection rate of the previous one
+        batch = min(BATCH, max(64, 2 * (count - len(fleets))))
+        picks = (rng.random((batch, len(fleet))) * sizes).astype(np.uint16)
+        cells = np.concatenate([table.indices[picks[:, ship]] for ship, table in enumerate(tables)], axis=1)
+        cells.sort(axis=1)
+        overlapping = (np.diff(cells, axis=1) == 0).any(axis=1)
+        fleets = np.concatenate([fleets, picks[~overlapping]])
+    return fleets[:count]
+
+################################################################################
+# Writes count uniform boards to path, in batches through a memory map, so     #
+# corpora of millions of boards never have to fit in memory.                   #
+################################################################################
+def save_corpus(path, count, fleet, board_size, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    corpus = np.lib.format.open_memmap(path, mode='w+', dtype=corpus_dtype(fleet), shape=(count,))
+    corpus['fleet'] = fleet
+    corpus['board_size'] = board_size
+    for start in range(0, count, BATCH):
+        stop = min(count, start + BATCH)
+        corpus['placement'][start:stop] = sample_fleets(stop - start, fleet, board_size, rng)
+    corpus.flush()
+    return corpus
+
+################################################################################
+# BOARDCORPUS CLASS: Fixed boards to play, read through a memory map so that   #
+# loading costs nothing up front and pages are shared between processes.       #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - corpus:     The memory-mapped structured array.                            #
+# - board_size: The width and height of the boards.                            #
+# - fleet:      The sizes of the ships of every board, in placement order.     #
+################################################################################
+class BoardCorpus():
+
+    def __init__(self, path):
+        self.corpus = np.load(path, mmap_mode='r')
+        self.board_size = int(self.corpus[0]['board_size']) if len(self.corpus) else 0
+        self.fleet = [int(size) for size in self.corpus[0]['fleet']] if len(self.corpus) else []
+
+    def __len__(self):
+        return len(self.corpus)
+
+    ############################################################################
+    # Returns the ships of board i as (ship_size, x, y, orientation) tuples,   #
+    # orientation 0 along y and 1 along x, as Board and Ship use them.         #
+    ############################################################################
+    def ships(self, i):
+        ships = []
+        for ship_size, placement in zip(self.fleet, self.corpus[i]['placement']):
+            table = get_placements(ship_size, self.board_size)
+            x, y = table.starts[placement]
+            ships.append((ship_size, int(x), int(y), int(table.orientation[placement])))
+        return ships
@@ -0,0 +1,222 @@
+import numpy as np
+from battleship_scripts.placements import get_placements
+
+################################################################################
+# Exact fleet counting.                                                        #
+# ---------------------------------------------------------------------------- #
+# The number of ways to place every remaining ship without overlap is counted  #
+# by inclusion-exclusion over which pairs of ships intersect. Two or three     #
+# straight ships on a grid intersect exactly when they share a run of cells,   #
+# so "do these ships intersect" is (shared cells) - (shared adjacent-cell      #
+# edges), which turns every inclusion-exclusion term into per-cell and         #
+# per-edge coverage counts. This gives a closed form for up to three ships;    #
+# larger fleets enumerate the placements of their biggest ships and evaluate   #
+# the closed form for the last three ships of every branch in one batch.       #
+# Ships are counted as distinct (the two 3s are different ships), which is the #
+# same convention as the independent product in Solution.get_total_states.     #
+# The work of the enumeration grows as branches x board_size ** 4. Callers     #
+# that would rather have an estimate than wait (big boards and fleets) pass a  #
+# max_work, above which the count is estimated from the exact pairwise terms   #
+# instead. Without one the count is always exact.                              #
+# Game.count_states estimates a hit mode position with estimate_fleets when    #
+# its ghost ship recursion could have more than max_ghost_leaves leaves, which #
+# the default fleet on 10 x 10 never reaches.                                  #
+################################################################################
+CLOSED_FORM_SHIPS = 3
+MAX_WORK = 10 ** 7
+MAX_GHOST_LEAVES = 10 ** 6
+GHOST_LEAF_SCALING = 6
+
+EDGE_INDICES = {}
+EDGES = {}
+INTERSECTIONS = {}
+
+################################################################################
+# Returns the (P, ship_size - 1) array of the adjacent-cell edges inside every #
+# placement. Edges are numbered horizontal ones first, then vertical ones.     #
+################################################################################
+def get_edge_indices(ship_size, board_size):
+    key = (ship_size, board_size)
+    if key not in EDGE_INDICES:
+        placements = get_placements(ship_size, board_size)
+        x, y = placements.starts[:, 0], placements.starts[:, 1]
+        horizontal = x * (board_size - 1) + y
+        vertical = board_size * (board_size - 1) + y * (board_size - 1) + x
+        first = np.where(placements.orientation == 0, horizontal, vertical)
+        EDGE_INDICES[key] = first[:, None] + np.arange(ship_size - 1)
+    return EDGE_INDICES[key]
+
+################################################################################
+# Returns a (P, E) matrix marking the adjacent-cell edges inside every         #
+# placement.                                                                   #
+################################################################################
+def get_edges(ship_size, board_size):
+    key = (ship_size, board_size)
+    if key not in EDGES:
+        indices = get_edge_indices(ship_size, board_size)
+        edges = np.zeros((len(indices), 2 * board_size * (board_size - 1)), dtype=float)
+        np.put_along_axis(edges, indices, 1, axis=1)
+        EDGES[key] = edges
+    return EDGES[key]
+
+################################################################################
+# Returns a (P_a, P_b) boolean matrix, True where placements intersect.        #
+################################################################################
+def get_intersections(size_a, size_b, board_size):
+    key = (size_a, size_b, board_size)
+    if key not in INTERSECTIONS:
+        cells_a = get_placements(size_a, board_size).cells
+        cells_b = get_placements(size_b, board_size).cells
+        INTERSECTIONS[key] = cells_a.dot(cells_b.T) > 0
+    return INTERSECTIONS[key]
+
+################################################################################
+# Counts the fleets in a batch of positions for at most three ships.           #
+# valid: list of (B, P_k) validity matrices, one per ship.                     #
+# Returns a length B vector of counts.                                         #
+# Coverage and degree counts are small integers, so the products run in        #
+# float32 (exact below 2 ** 24) and only the sums are taken in float64.        #
+################################################################################
+def closed_form(valid, sizes, board_size):
+    n = [v.sum(axis=1, dtype=float) for v in valid]
+    if len(valid) == 0:
+        return np.ones(1)
+    if len(valid) == 1:
+        return n[0]
+
+    valid = [v.astype(np.float32, copy=False) for v in valid]
+    cells = [get_placements(size, board_size).cells.astype(np.float32) for size in sizes]
+    edges = [get_edges(size, board_size).astype(np.float32) for size in sizes]
+
+    # coverage of every cell and edge by the valid placements of each ship
+    cov = [v.dot(c) for v, c in zip(valid, cells)]
+    ecov = [v.dot(e) for v, e in zip(valid, edges)]
+
+    # pairs[a][b]: the pairs of valid placements of a and b that intersect
+    def pairs(a, b):
+        return (cov[a] * cov[b]).sum(axis=1, dtype=float) - (ecov[a] * ecov[b]).sum(axis=1, dtype=float)
+
+    # degree[a][b]: for every placement of a, the valid placements of b hitting it
+    def degree(a, b):
+        return cov[b].dot(cells[a].T) - ecov[b].dot(edges[a].T)
+
+    if len(valid) == 2:
+        return n[0] * n[1] - pairs(0, 1)
+
+    d01, d02, d12 = degree(0, 1), degree(0, 2), degree(1, 2)
+    d10, d20, d21 = degree(1, 0), degree(2, 0), degree(2, 1)
+
+    # pairs that intersect
+    e01, e02, e12 = pairs(0, 1), pairs(0, 2), pairs(1, 2)
+
+    # one ship intersecting both others
+    c0 = (valid[0] * d01 * d02).sum(axis=1, dtype=float)
+    c1 = (valid[1] * d10 * d12).sum(axis=1, dtype=float)
+    c2 = (valid[2] * d20 * d21).sum(axis=1, dtype=float)
+
+    # all three share a run of cells
+    t = (cov[0] * cov[1] * cov[2]).sum(axis=1, dtype=float) - (ecov[0] * ecov[1] * ecov[2]).sum(axis=1, dtype=float)
+
+    return n[0] * n[1] * n[2] - e01 * n[2] - e02 * n[1] - e12 * n[0] + c0 + c1 + c2 - t
+
+################################################################################
+# Estimates the fleets of a position from its pairwise terms: the product of   #
+# the placements of every ship, times the fraction of the placements of every  #
+# pair of ships that do not intersect (exact for two ships). The intersecting  #
+# pairs of ships a and b are cov_a . cov_b - ecov_a . ecov_b, so all pairs     #
+# come from one product of the coverage vectors.                               #
+# valid: list of (1, P_k) validity matrices, one per ship.                     #
+################################################################################
+def estimate(valid, sizes, board_size):
+    n = np.array([v.sum(dtype=float) for v in valid])
+    if n.min() == 0:
+        return 0
+    cells, edges = board_size * board_size, 2 * board_size * (board_size - 1)
+    cov = np.zeros((len(sizes), cells))
+    ecov = np.zeros((len(sizes), edges))
+    for k, (v, size) in enumerate(zip(valid, sizes)):
+        chosen = v[0] > 0
+        cov[k] = np.bincount(get_placements(size, board_size).indices[chosen].ravel(), minlength=cells)
+        ecov[k] = np.bincount(get_edge_indices(size, board_size)[chosen].ravel(), minlength=edges)
+    free = 1 - (cov.dot(cov.T) - ecov.dot(ecov.T)) / np.outer(n, n)
+    return np.prod(n) * np.prod(free[np.triu_indices(len(sizes), 1)])
+
+################################################################################
+# Counts fleets that avoid the blocked cells, ignoring hit cells. Estimated    #
+# instead if the enumeration would take more than max_work (if given).         #
+################################################################################
+def count_unconstrained(blocked, ships, board_size, max_work=None):
+    sizes = sorted(ships, reverse=True)
+    valid = []
+    for size in sizes:
+        placements = get_placements(size, board_size)
+        valid.append((blocked[placements.indices].sum(axis=1) == 0)[None, :].astype(np.float32))
+
+    branches = np.prod([v.sum(dtype=float) for v in valid[:-CLOSED_FORM_SHIPS]])
+    if max_work is not None and branches * board_size ** 4 > max_work:
+        return int(round(estimate(valid, sizes, board_size)))
+
+    # enumerate the placements of the biggest ships until the closed form applies
+    while len(sizes) > CLOSED_FORM_SHIPS:
+        rows, picks = np.nonzero(valid[0])
+        if len(rows) == 0:
+            return 0
+        valid = [v[rows] * ~get_intersections(sizes[0], size, board_size)[picks]
+                 for v, size in zip(valid[1:], sizes[1:])]
+        sizes = sizes[1:]
+
+    return int(round(closed_form(valid, sizes, board_size).sum()))
+
+################################################################################
+# Returns the number of fleets of remaining_ships consistent with the game     #
+# state: no ship on a missed (1) or sunk (3) cell, no two ships overlapping,   #
+# and every hit (2) cell covered by some ship. Hit cells are handled by        #
+# inclusion-exclusion over which of them are left uncovered.                   #
+# max_work: Optional work above which the count is only estimated. None (the   #
+#           default) always counts exactly, however long it takes.             #
+################################################################################
+def count_fleets(game_state, remaining_ships, board_size, max_work=None):
+    blocked = ((game_state == 1) | (game_state == 3)).reshape(-1).astype(int)
+    hits = np.flatnonzero(game_state == 2)
+
+    total = 0
+    for subset in range(1 << len(hits)):
+        uncovered = blocked.copy()
+        for bit, cell in enumerate(hits):
+            if subset >> bit & 1:
+                uncovered[cell] = 1
+        sign = -1 if bin(subset).count("1") % 2 else 1
+        total += sign * count_unconstrained(uncovered, remaining_ships, board_size, max_work)
+    return total
+
+################################################################################
+# Returns the number of leaves above which the ghost ship recursion of a hit   #
+# mode position on a board_size board is estimated instead. Leaves cost about  #
+# board_size ** 4 each and bigger fleets make more of them, so the             #
+# MAX_GHOST_LEAVES of a 10 x 10 board shrink as board_size **                  #
+# GHOST_LEAF_SCALING (which keeps 20 x 20 moves under half a second).          #
+################################################################################
+def max_ghost_leaves(board_size):
+    return MAX_GHOST_LEAVES * (10 / board_size) ** GHOST_LEAF_SCALING
+
+################################################################################
+# Estimates the fleets of a hit mode position: the fleets that fit around the  #
+# misses and sinks, times the chance that every hit cell is covered, treating  #
+# the ships and the hit cells as independent. The fleets around the misses     #
+# and sinks are themselves estimated above MAX_WORK.                           #
+################################################################################
+def estimate_fleets(game_state, remaining_ships, board_size):
+    hits = (game_state == 2).reshape(-1)
+    blocked = ((game_state == 1) | (game_state == 3)).reshape(-1).astype(int)
+
+    missed = np.ones(hits.sum())
+    for ship_size in remaining_ships:
+        placements = get_placements(ship_size, board_size)
+        valid = blocked[placements.indices].sum(axis=1) == 0
+        if not valid.any():
+            return 0
+        missed *= 1 - valid.dot(placements.cells[:, hits]) / valid.sum()
+
+    free = count_fleets(np.where(hits.reshape(game_state.shape), 0, game_state), remaining_ships, board_size,
+                        MAX_WORK)
+    return int(round(free * np.prod(1 - missed)))
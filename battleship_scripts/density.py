@@ -0,0 +1,225 @@
+import numpy as np
+from battleship_scripts.placements import get_placements
+
+################################################################################
+# Hunt/target density kernel.                                                  #
+# ---------------------------------------------------------------------------- #
+# Every placement of a ship is a window of ship_size cells along a row or a    #
+# column, so all placements of one orientation are the sliding windows of the  #
+# game state along one axis. A placement is valid if its window holds no miss  #
+# (1) or sunk (3) cell and is weighted 50 * sum ** 2 + 1, where sum is the sum #
+# of the game state values it covers.                                          #
+# The window sums of every ship size are differences of one prefix sum of the  #
+# rows (and one of the columns), and the weights are spread back onto the      #
+# cells with a window x cell coverage matrix. Everything is integer            #
+# arithmetic, so the result is exact, and all functions work on the last two   #
+# axes, so a stack of boards is evaluated in the same pass.                    #
+################################################################################
+
+################################################################################
+# Cache of window tables, keyed by (ship_sizes, board_size).                   #
+################################################################################
+WINDOWS = {}
+
+################################################################################
+# Returns (lo, hi, size_index, cover) for the windows of every ship size along #
+# one line of the board: the window of cells lo..hi-1 sums to                  #
+# prefix[hi] - prefix[lo], belongs to ship_sizes[size_index] and covers the    #
+# cells set in its row of the coverage matrix.                                 #
+################################################################################
+def get_windows(ship_sizes, board_size):
+    key = (ship_sizes, board_size)
+    if key not in WINDOWS:
+        lo, hi, size_index = [], [], []
+        for i, ship_size in enumerate(ship_sizes):
+            for start in range(board_size - ship_size + 1):
+                lo.append(start)
+                hi.append(start + ship_size)
+                size_index.append(i)
+        cells = np.arange(board_size)
+        lo, hi = np.array(lo, dtype=int), np.array(hi, dtype=int)
+        cover = ((cells >= lo[:, None]) & (cells < hi[:, None])).astype(np.int64)
+        WINDOWS[key] = (lo, hi, np.array(size_index, dtype=int), cover)
+    return WINDOWS[key]
+
+################################################################################
+# Returns the integer density of (..., board_size, board_size) game states:    #
+# the summed weights of the valid placements covering each cell.               #
+# ship_sizes: tuple of distinct ship sizes.                                    #
+# counts:     (..., len(ship_sizes)) array of how many ships of each size are  #
+#             left on every board.                                             #
+################################################################################
+def fleet_density(game_state, ship_sizes, counts):
+    board_size = game_state.shape[-1]
+    lo, hi, size_index, cover = get_windows(ship_sizes, board_size)
+
+    # rows hold the horizontal placements, the transposed board the vertical ones
+    lines = np.stack((game_state, np.swapaxes(game_state, -1, -2)))
+    stacked = np.stack((lines, (lines == 1) | (lines == 3)))
+    prefix = np.zeros(stacked.shape[:-1] + (board_size + 1,), dtype=np.int32)
+    np.cumsum(stacked, axis=-1, out=prefix[..., 1:])
+
+    sums, blocked = prefix[..., hi] - prefix[..., lo]
+    weights = np.where(blocked == 0, 50 * np.square(sums, dtype=np.int64) + 1, 0)
+    weights *= np.asarray(counts)[..., None, size_index]
+
+    horizontal, vertical = weights.dot(cover)
+    return horizontal + np.swapaxes(vertical, -1, -2)
+
+################################################################################
+# Returns the (len(fleets), len(ship_sizes)) array of how many ships of each   #
+# size every fleet holds.                                                      #
+################################################################################
+def fleet_counts(fleets, ship_sizes):
+    counts = np.zeros((len(fleets), len(ship_sizes)), dtype=np.int64)
+    for i, fleet in enumerate(fleets):
+        for ship_size in fleet:
+            counts[i, ship_sizes.index(ship_size)] += 1
+    return counts
+
+################################################################################
+# Returns the float density of a fleet (an iterable of ship sizes, repeated    #
+# sizes counted once per ship) over one or a stack of game states.             #
+################################################################################
+def density_map(game_state, fleet):
+    ship_sizes = tuple(sorted(set(fleet)))
+    counts = fleet_counts([fleet], ship_sizes)[0]
+    return fleet_density(game_state, ship_sizes, counts).astype(float)
+
+################################################################################
+# Cache of tracker tables, keyed by (ship_sizes, board_size).                  #
+################################################################################
+TRACKER_TABLES = {}
+
+################################################################################
+# Returns (size_index, indices, placement_of, offsets) for the placements of   #
+# every ship size together: the index of its size in ship_sizes, its covered   #
+# cells padded with the sentinel cell board_size ** 2, and the placements      #
+# covering every cell c as placement_of[offsets[c]:offsets[c + 1]].            #
+################################################################################
+def get_tracker_table(ship_sizes, board_size):
+    key = (ship_sizes, board_size)
+    if key not in TRACKER_TABLES:
+        cells = board_size * board_size
+        width = max(ship_sizes)
+        size_index, indices = [], []
+        for i, ship_size in enumerate(ship_sizes):
+            placement_indices = get_placements(ship_size, board_size).indices
+            size_index.append(np.full(len(placement_indices), i))
+            indices.append(np.pad(placement_indices, ((0, 0), (0, width - ship_size)), constant_values=cells))
+        size_index, indices = np.concatenate(size_index), np.concatenate(indices)
+
+        flat = indices.ravel()
+        offsets = np.zeros(cells + 2, dtype=int)
+        np.cumsum(np.bincount(flat, minlength=cells + 1), out=offsets[1:])
+        placement_of = np.argsort(flat, kind='stable') // width
+        TRACKER_TABLES[key] = (size_index, indices, placement_of, offsets[:cells + 1])
+    return TRACKER_TABLES[key]
+
+################################################################################
+# Returns the weights of placements with the given numbers of blocked (missed  #
+# or sunk) and hit cells, the same as fleet_density.                           #
+################################################################################
+def placement_weights(blocked, hits):
+    return np.where(blocked == 0, 50 * np.square(2 * hits.astype(np.int64)) + 1, 0)
+
+################################################################################
+# DENSITYTRACKER CLASS: The density of one position, kept up to date between  #
+# moves instead of rebuilt.                                                    #
+# ---------------------------------------------------------------------------- #
+# Every placement keeps its number of blocked and hit cells, and every ship    #
+# size keeps the map of its weights spread over the cells. When the position  #
+# changes, only the placements covering a changed cell are reweighted and      #
+# their difference added to the maps, so a shot costs the placements touching #
+# one cell instead of all of them. The fleet only scales the map of every      #
+# size, so the density of any fleet is one product. The result is exactly     #
+# that of density_map.                                                         #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - ship_sizes:       Tuple of distinct ship sizes tracked.                    #
+# - board_size:       The width and height of the board.                       #
+# - miss, hit, sunk:  Bitmasks of the position the counts are for (as State).  #
+# - blocked, hits:    Counts of every placement of get_tracker_table.          #
+# - size_maps:        (len(ship_sizes), board_size ** 2 + 1) weights per cell, #
+#                     the last column collecting the padding.                  #
+################################################################################
+class DensityTracker():
+
+    ############################################################################
+    # Starts from the empty board, where every placement has weight 1.         #
+    ############################################################################
+    def __init__(self, ship_sizes, board_size):
+        self.ship_sizes = tuple(ship_sizes)
+        self.board_size = board_size
+        self.miss, self.hit, self.sunk = 0, 0, 0
+        size_index, indices, _, _ = get_tracker_table(self.ship_sizes, board_size)
+        self.blocked = np.zeros(len(indices), dtype=np.int16)
+        self.hits = np.zeros(len(indices), dtype=np.int16)
+        self.size_maps = self.spread(np.arange(len(indices)), np.ones(len(indices)))
+
+    ############################################################################
+    # Returns the (len(ship_sizes), board_size ** 2 + 1) map of weights given  #
+    # to the placements.                                                       #
+    ############################################################################
+    def spread(self, placements, weights):
+        size_index, indices, _, _ = get_tracker_table(self.ship_sizes, self.board_size)
+        columns = self.board_size * self.board_size + 1
+        bins = (size_index[placements, None] * columns + indices[placements]).ravel()
+        spread = np.bincount(bins, np.repeat(weights, indices.shape[1]), minlength=len(self.ship_sizes) * columns)
+        return spread.reshape(len(self.ship_sizes), columns)
+
+    ############################################################################
+    # Returns an independent copy, e.g. for a hypothesis branching off.        #
+    ############################################################################
+    def copy(self):
+        tracker = DensityTracker.__new__(DensityTracker)
+        tracker.ship_sizes, tracker.board_size = self.ship_sizes, self.board_size
+        tracker.miss, tracker.hit, tracker.sunk = self.miss, self.hit, self.sunk
+        tracker.blocked = self.blocked.copy()
+        tracker.hits = self.hits.copy()
+        tracker.size_maps = self.size_maps.copy()
+        return tracker
+
+    ############################################################################
+    # Moves the counts to the position with the given bitmasks, reweighting    #
+    # only the placements that cover a cell whose value changed.               #
+    ############################################################################
+    def update(self, miss, hit, sunk):
+        changed = (self.miss ^ miss) | (self.hit ^ hit) | (self.sunk ^ sunk)
+        if not changed:
+            return
+        _, _, placement_of, offsets = get_tracker_table(self.ship_sizes, self.board_size)
+        touched, blocked_change, hit_change = [], [], []
+        while changed:
+            bit = changed & -changed
+            changed ^= bit
+            cell = bit.bit_length() - 1
+            placements = placement_of[offsets[cell]:offsets[cell + 1]]
+            touched.append(placements)
+            blocked_change.append(np.full(len(placements), bool((miss | sunk) & bit) - bool((self.miss | self.sunk) & bit)))
+            hit_change.append(np.full(len(placements), bool(hit & bit) - bool(self.hit & bit)))
+
+        if len(touched) == 1:
+            placements = touched[0]
+            before = placement_weights(self.blocked[placements], self.hits[placements])
+            self.blocked[placements] += blocked_change[0]
+            self.hits[placements] += hit_change[0]
+        else:
+            # a placement may cover several changed cells
+            touched = np.concatenate(touched)
+            placements = np.unique(touched)
+            before = placement_weights(self.blocked[placements], self.hits[placements])
+            np.add.at(self.blocked, touched, np.concatenate(blocked_change))
+            np.add.at(self.hits, touched, np.concatenate(hit_change))
+        delta = placement_weights(self.blocked[placements], self.hits[placements]) - before
+        moved = delta != 0
+        self.size_maps += self.spread(placements[moved], delta[moved])
+        self.miss, self.hit, self.sunk = miss, hit, sunk
+
+    ############################################################################
+    # Returns the float density of the position for a fleet (an iterable of    #
+    # ship sizes, repeated sizes counted once per ship).                       #
+    ############################################################################
+    def density(self, fleet):
+        counts = fleet_counts([fleet], self.ship_sizes)[0]
+        return counts.dot(self.size_maps[:, :-1]).reshape(self.board_size, self.board_size)
@@ -0,0 +1,25 @@
+import numpy as np
+
+################################################################################
+# Expected information gain of a shot.                                         #
+# ---------------------------------------------------------------------------- #
+# A shot at a cell reveals one of three outcomes: miss, hit or sink. The       #
+# outcome is a function of the configuration, so the expected entropy left     #
+# over the consistent configurations after the shot is their entropy now       #
+# minus the entropy of the outcome, and the information gained is exactly      #
+# H(miss, hit, sink) at that cell:                                             #
+#   P(miss) = 1 - p, P(hit) = p - s, P(sink) = s                               #
+# with p the probability that the cell holds a ship and s the probability that #
+# it holds a ship hit on every other cell. Every cell is scored at once.       #
+################################################################################
+
+################################################################################
+# Returns the entropy in bits of the outcome of a shot at every cell, given    #
+# arrays of the same shape of occupancy (p) and sink (s) probabilities.        #
+################################################################################
+def outcome_entropy(occupancy, sink):
+    p = np.clip(occupancy, 0, 1)
+    s = np.clip(sink, 0, p)
+    outcomes = np.stack([1 - p, p - s, s])
+    logs = np.log2(np.where(outcomes > 0, outcomes, 1))
+    return -(outcomes * logs).sum(axis=0)
@@ -0,0 +1,169 @@
+import json
+import os
+import time
+from collections import defaultdict
+from functools import wraps
+
+################################################################################
+# Opt-in instrumentation of the solver's hot paths.                            #
+# ---------------------------------------------------------------------------- #
+# Methods decorated with timed(name) look up self.metrics on every call. While #
+# it is None (the default) they only pay for the wrapper call and that lookup  #
+# (~0.5 us); with a Metrics object they are counted and timed. Recursive       #
+# calls (eval_state walks the hypothesis tree) are counted every time but      #
+# timed only at the outermost call, so the seconds of a function are           #
+# inclusive and never double counted.                                          #
+#                                                                              #
+# Every move adds one record to the trace, with what changed during the move:  #
+# calls and seconds per function, positions whose states were enumerated       #
+# (count_states cache misses), live hypotheses and the deepest instance_depth. #
+# The trace is written as JSON lines and the totals as a Prometheus textfile.  #
+################################################################################
+
+PREFIX = "battleship"
+
+################################################################################
+# Decorator counting and timing a method under name when self.metrics is set.  #
+################################################################################
+def timed(name):
+    def decorate(function):
+        @wraps(function)
+        def wrapper(self, *args):
+            metrics = self.metrics
+            if metrics is None:
+                return function(self, *args)
+            return metrics.call(name, function, self, *args)
+        return wrapper
+    return decorate
+
+################################################################################
+# METRICS CLASS: Counters, timers and the per-move trace of one or more games. #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - calls:    Number of calls of every timed function.                         #
+# - seconds:  Inclusive seconds spent in every timed function.                 #
+# - counters: Other event counts: moves, degraded_moves, states_enumerated.    #
+# - moves:    One trace record (dict) per move; may be cleared once written,   #
+#             the totals do not depend on it.                                  #
+# - games:    Number of games finished.                                        #
+# - max_live, max_depth: Most live hypotheses and deepest instance_depth seen. #
+################################################################################
+class Metrics():
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.moves = []
+        self.games = 0
+        self.max_live = 0
+        self.max_depth = 0
+        self.move_seconds = 0.0
+        self.active = set()
+        self.last = ({}, {}, {})
+
+    ############################################################################
+    # Calls function, counting it and timing it unless it is already running.  #
+    ############################################################################
+    def call(self, name, function, *args):
+        self.calls[name] += 1
+        if name in self.active:
+            return function(*args)
+        self.active.add(name)
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.active.discard(name)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    ############################################################################
+    # Closes a move of game that took seconds: appends its trace record.       #
+    ############################################################################
+    def end_move(self, game, seconds):
+        live = game.solution.size - 1
+        depth = max(instance.instance_depth for instance in game.solution.walk())
+        self.max_live = max(self.max_live, live)
+        self.max_depth = max(self.max_depth, depth)
+        self.move_seconds += seconds
+        self.counters['moves'] += 1
+        self.counters['degraded_moves'] += game.degraded
+
+        calls, function_seconds, counters = self.last
+        record = {
+            'move': game.solution.move_count,
+            'seconds': seconds,
+            'degraded': game.degraded,
+            'live_instances': live,
+            'max_depth': depth,
+            'states_enumerated': self.counters['states_enumerated'] - counters.get('states_enumerated', 0),
+            'calls': {name: count - calls.get(name, 0) for name, count in self.calls.items()},
+            'function_seconds': {name: total - function_seconds.get(name, 0.0)
+                                 for name, total in self.seconds.items()},
+        }
+        self.moves.append(record)
+        self.last = (dict(self.calls), dict(self.seconds), dict(self.counters))
+
+    def end_game(self):
+        self.games += 1
+
+    ############################################################################
+    # Adds the totals and trace of other (e.g. from a worker process).         #
+    ############################################################################
+    def merge(self, other):
+        for name, count in other.calls.items():
+            self.calls[name] += count
+        for name, total in other.seconds.items():
+            self.seconds[name] += total
+        for name, count in other.counters.items():
+            self.counters[name] += count
+        self.moves += other.moves
+        self.games += other.games
+        self.max_live = max(self.max_live, other.max_live)
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.move_seconds += other.move_seconds
+
+    ############################################################################
+    # Writes every move record as one JSON line to the open file f, with the   #
+    # extra fields (e.g. game=3) added to every record.                        #
+    ############################################################################
+    def write_trace(self, f, **fields):
+        for record in self.moves:
+            f.write(json.dumps({**fields, **record}) + "\n")
+
+    ############################################################################
+    # Writes the totals in the Prometheus text format. The file is written     #
+    # next to path and renamed over it, so that a node_exporter textfile       #
+    # collector never reads it half written.                                   #
+    ############################################################################
+    def write_prometheus(self, path):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if labels else f"{PREFIX}_{name} {value}")
+
+        metric("games_total", "counter", "Games played.", [({}, self.games)])
+        metric("moves_total", "counter", "Moves played.", [({}, self.counters['moves'])])
+        metric("move_seconds_total", "counter", "Seconds spent in moves.", [({}, self.move_seconds)])
+        metric("degraded_moves_total", "counter", "Moves that ran out of their move budget.",
+               [({}, self.counters['degraded_moves'])])
+        metric("calls_total", "counter", "Calls of a timed function.",
+               [({'function': name}, count) for name, count in sorted(self.calls.items())])
+        metric("function_seconds_total", "counter", "Inclusive seconds spent in a timed function.",
+               [({'function': name}, total) for name, total in sorted(self.seconds.items())])
+        metric("states_enumerated_total", "counter", "Positions whose states were counted (cache misses).",
+               [({}, self.counters['states_enumerated'])])
+        metric("live_instances_max", "gauge", "Most live hypotheses after a move.", [({}, self.max_live)])
+        metric("instance_depth_max", "gauge", "Deepest hypothesis after a move.", [({}, self.max_depth)])
+
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temporary, path)
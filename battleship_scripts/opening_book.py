@@ -0,0 +1,62 @@
+import numpy as np
+
+################################################################################
+# Returns the search key of a miss-only position: its miss mask as big endian  #
+# bytes, so keys sort like the masks. NumPy drops trailing null bytes from     #
+# bytes fields, so every key ends in a 1 byte to keep its full width.          #
+################################################################################
+def position_key(miss, board_size):
+    return miss.to_bytes((board_size * board_size + 7) // 8, 'big') + b'\x01'
+
+################################################################################
+# Writes the book entries to path as a sorted NumPy structured array.          #
+# entries: list of (miss mask, best move (x, y), density map).                 #
+################################################################################
+def save_book(path, entries, fleet, board_size):
+    nbytes = (board_size * board_size + 7) // 8 + 1
+    dtype = np.dtype([('miss', f'S{nbytes}'), ('move', np.uint16),
+                      ('density', np.float32, (board_size, board_size)),
+                      ('fleet', np.uint8, (len(fleet),))])
+    book = np.zeros(len(entries), dtype=dtype)
+    for i, (miss, move, density) in enumerate(entries):
+        book[i] = (position_key(miss, board_size), move[0] * board_size + move[1], density, fleet)
+    book.sort(order='miss')
+    np.save(path, book)
+
+################################################################################
+# OPENINGBOOK CLASS: Best moves and density maps of the positions before the   #
+# first hit, read through a memory map so loading costs nothing up front.      #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - book:       The memory-mapped structured array, sorted by miss key.        #
+# - board_size: The width and height of the board the book was built for.      #
+# - fleet:      The fleet the book was built for.                              #
+# - hits:       Number of positions answered from the book.                    #
+################################################################################
+class OpeningBook():
+
+    def __init__(self, path):
+        self.book = np.load(path, mmap_mode='r')
+        self.board_size = self.book.dtype['density'].shape[0]
+        self.fleet = tuple(int(s) for s in self.book[0]['fleet']) if len(self.book) else ()
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.book)
+
+    ############################################################################
+    # Returns (density map, best move) for a miss-only state in the book, or   #
+    # None if the state has hits or sinks or is not in the book.               #
+    ############################################################################
+    def lookup(self, state):
+        if state.hit or state.sunk or state.board_size != self.board_size:
+            return None
+        if tuple(state.fleet) != self.fleet:
+            return None
+        key = position_key(state.miss, self.board_size)
+        i = np.searchsorted(self.book['miss'], key)
+        if i == len(self.book) or self.book[i]['miss'] != key:
+            return None
+        self.hits += 1
+        entry = self.book[i]
+        return np.array(entry['density'], dtype=float), divmod(int(entry['move']), self.board_size)
@@ -0,0 +1,72 @@
+import numpy as np
+
+################################################################################
+# Cache of placement tables, keyed by (ship_size, board_size).                 #
+################################################################################
+TABLES = {}
+
+################################################################################
+# Returns the (cached) placement table for a ship size on a square board.      #
+################################################################################
+def get_placements(ship_size, board_size):
+    key = (ship_size, board_size)
+    if key not in TABLES:
+        TABLES[key] = Placements(ship_size, board_size)
+    return TABLES[key]
+
+################################################################################
+# PLACEMENTS CLASS: Precomputed table of every location a ship of one size can #
+# occupy on the board. Validity checks gather the covered cells of every       #
+# placement at once (work grows with ship_size, not the board area), and the   #
+# counts are bulk products with the placement x cell matrix.                   #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - ship_size:   The length of the ship.                                       #
+# - board_size:  The width and height of the board.                            #
+# - starts:      (P, 2) array of the top left corner of every placement.       #
+# - orientation: (P,) array, 0 = horizontal (along y), 1 = vertical (along x). #
+# - indices:     (P, ship_size) array of the flat cell indices covered.        #
+# - cells:       (P, board_size ** 2) placement x cell matrix, 1 if covered.   #
+# - masks:       The same placements as integer bitmasks, where bit            #
+#                x * board_size + y is set for every covered cell (x, y).      #
+################################################################################
+class Placements():
+
+    ############################################################################
+    # Enumerates placements in the same order the solver always has: for each  #
+    # row/column pos and offset, the horizontal one then the vertical one.     #
+    ############################################################################
+    def __init__(self, ship_size, board_size):
+        self.ship_size = ship_size
+        self.board_size = board_size
+
+        starts = []
+        orientation = []
+        for pos in range(board_size):
+            for length in range(board_size - ship_size + 1):
+                starts.append((pos, length))
+                orientation.append(0)
+                starts.append((length, pos))
+                orientation.append(1)
+        self.starts = np.array(starts, dtype=int).reshape(-1, 2)
+        self.orientation = np.array(orientation, dtype=int)
+
+        # flat indices of every covered cell
+        steps = np.where(self.orientation[:, None] == 0, 1, board_size) * np.arange(ship_size)
+        self.indices = (self.starts[:, 0] * board_size + self.starts[:, 1])[:, None] + steps
+
+        self.cells = np.zeros((len(self.starts), board_size * board_size), dtype=float)
+        np.put_along_axis(self.cells, self.indices, 1, axis=1)
+
+        self.masks = [sum(1 << int(i) for i in row) for row in self.indices]
+
+    def __len__(self):
+        return len(self.starts)
+
+    ############################################################################
+    # Returns a boolean vector, True where the placement only covers cells     #
+    # that are not tried (0) or hit (2).                                       #
+    ############################################################################
+    def valid(self, game_state):
+        blocked = ((game_state == 1) | (game_state == 3)).reshape(-1)
+        return ~blocked[self.indices].any(axis=1)
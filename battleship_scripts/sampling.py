@@ -0,0 +1,296 @@
+import time
+from collections import defaultdict, namedtuple
+import numpy as np
+from battleship_scripts.placements import get_placements
+
+################################################################################
+# Posterior sampling engine.                                                   #
+# ---------------------------------------------------------------------------- #
+# Draws whole fleets consistent with everything the game has shown so far and  #
+# averages them into the probability that each cell holds a ship. Unlike the   #
+# hypothesis tree, nothing here grows with the number of unresolved hits or    #
+# sinks, so it stays cheap in the deep hit-mode positions the exact engine     #
+# struggles with, and it can stop after any batch.                             #
+#                                                                              #
+# Fleets are drawn by sequential importance sampling. Every fleet is built in  #
+# a fixed order that it determines itself:                                     #
+#   1. for every sink, in order, the ship sunk there: a placement through the  #
+#      sunk cell whose other cells were all hit before it,                     #
+#   2. while a hit cell is uncovered, the ship covering the first one,         #
+#   3. every ship left, by its index in the fleet.                             #
+# Every step picks uniformly among its options and multiplies the weight of    #
+# the sample by their number, so the weights are unbiased counts and the       #
+# weighted samples are uniform over the consistent fleets (ships distinct, as  #
+# in counting.py). A ship may not cover a miss, a ship not sunk may not be     #
+# hit on every cell, and ships may not overlap.                                #
+################################################################################
+
+################################################################################
+# Result of a sampling run.                                                    #
+# - p:                 Probability map, 0 on every cell already shot at.       #
+# - samples:           Number of fleets drawn.                                 #
+# - effective_samples: Effective sample size of the weighted fleets, 0 if no   #
+#                      consistent fleet was found.                             #
+# - count:             Estimated number of consistent fleets.                  #
+# - elapsed:           Seconds spent sampling.                                 #
+# - target:            The part of p from the ships drawn to cover hits.       #
+# - free:              Expected number of cells of the ships drawn freely      #
+#                      (step 3), the rest of p.                                #
+# - fleet:             The likeliest sizes of the ships drawn freely.          #
+# - sink:              Probability that a shot at each cell sinks a ship: the  #
+#                      cell holds a ship hit on every other cell.              #
+################################################################################
+Posterior = namedtuple('Posterior', ['p', 'samples', 'effective_samples', 'count', 'elapsed', 'target', 'free',
+                                     'fleet', 'sink'])
+
+# bound on batch size x placements x cells per placement for one batch
+BATCH_WORK = 4 * 10 ** 6
+MAX_BATCH = 4096
+################################################################################
+# Cache of labelled placement tables, keyed by (fleet, board_size).            #
+################################################################################
+TABLES = {}
+
+# first batch under a deadline; batches double from there as long as the time
+# they take (from the time per fleet so far) still fits before the deadline
+FIRST_BATCH = 64
+
+################################################################################
+# Returns (ship_of, indices, cover) for every placement of every ship of the   #
+# fleet: the index of the ship in the fleet, the covered cells padded with the #
+# sentinel cell board_size ** 2, and the placement x cell coverage matrix.     #
+################################################################################
+def get_table(fleet, board_size):
+    key = (fleet, board_size)
+    if key not in TABLES:
+        cells = board_size * board_size
+        width = max(fleet)
+        ship_of, indices = [], []
+        for ship, ship_size in enumerate(fleet):
+            placement_indices = get_placements(ship_size, board_size).indices
+            ship_of.append(np.full(len(placement_indices), ship))
+            indices.append(np.pad(placement_indices, ((0, 0), (0, width - ship_size)), constant_values=cells))
+        ship_of, indices = np.concatenate(ship_of), np.concatenate(indices)
+        cover = np.zeros((len(indices), cells + 1), dtype=bool)
+        np.put_along_axis(cover, indices, True, axis=1)
+        TABLES[key] = (ship_of, indices, cover[:, :cells])
+    return TABLES[key]
+
+################################################################################
+# POSTERIORSAMPLER CLASS: Fleets consistent with a game history.               #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - board_size: The width and height of the board.                             #
+# - fleet:      The sizes of every ship of the game, sunk ones included.       #
+# - miss, hit:  Boolean cell vectors of the M and H results.                   #
+# - sinks:      Cells of the S results, in the order they were played.         #
+# - ship_of:    Ship index of every placement of the labelled table.           #
+# - indices:    Covered cells of every placement, padded with the sentinel     #
+#               cell board_size ** 2 that is never occupied.                   #
+# - cover:      Placement x cell boolean matrix.                               #
+# - free:       Placements usable in steps 2 and 3.                            #
+# - sink_options: Placements usable for every sink in step 1.                  #
+################################################################################
+class PosteriorSampler():
+
+    ############################################################################
+    # history: List of (x, y, result) of every shot, in order.                 #
+    ############################################################################
+    def __init__(self, board_size, fleet, history):
+        self.board_size = board_size
+        self.fleet = list(fleet)
+        cells = board_size * board_size
+
+        self.miss = np.zeros(cells, dtype=bool)
+        self.hit = np.zeros(cells, dtype=bool)
+        sunk = np.zeros(cells, dtype=bool)
+        order = np.full(cells, len(history), dtype=int)
+        self.sinks = []
+        for turn, (x, y, result) in enumerate(history):
+            cell = int(x) * board_size + int(y)
+            order[cell] = min(order[cell], turn)
+            match result:
+                case 'M':
+                    self.miss[cell] = True
+                case 'H':
+                    self.hit[cell] = True
+                case 'S':
+                    sunk[cell] = True
+                    self.sinks.append(cell)
+        self.tried = self.miss | self.hit | sunk
+        self.ship_of, self.indices, self.cover = get_table(tuple(self.fleet), board_size)
+
+        # cell vectors gathered by the padded indices; the sentinel is neither missed nor sunk, and
+        # counts as hit so that padding never keeps a placement from lying entirely on hits
+        def gather(cells_mask, sentinel=False):
+            return np.append(cells_mask, sentinel)[self.indices]
+
+        covers_miss = gather(self.miss).any(axis=1)
+        sink_cells = gather(sunk).sum(axis=1)
+        all_hit = gather(self.hit, True).all(axis=1)
+        self.free = ~covers_miss & (sink_cells == 0) & ~all_hit
+        self.hit_options = np.flatnonzero(self.free & gather(self.hit).any(axis=1))
+
+        self.sink_options = []
+        for cell in self.sinks:
+            # the rest of the ship was hit before it sank
+            earlier = self.hit & (order < order[cell])
+            earlier[cell] = True
+            inside = gather(earlier, True).all(axis=1)
+            through = (self.indices == cell).any(axis=1)
+            self.sink_options.append(np.flatnonzero(through & inside & (sink_cells == 1)))
+
+        self.ship_options = [np.flatnonzero(self.free & (self.ship_of == ship)) for ship in range(len(self.fleet))]
+        most = max([len(self.hit_options)] + [len(options) for options in self.ship_options])
+        self.batch = int(max(16, min(MAX_BATCH, BATCH_WORK // max(1, most * max(self.fleet)))))
+
+    ############################################################################
+    # Picks one True column per row uniformly. Returns the option counts and   #
+    # the chosen columns.                                                      #
+    ############################################################################
+    def choose(self, mask, rng):
+        count = mask.sum(axis=1)
+        u = rng.random(len(mask)) * count
+        choice = (mask.cumsum(axis=1) <= u[:, None]).sum(axis=1)
+        return count, np.minimum(choice, mask.shape[1] - 1)
+
+    ############################################################################
+    # Applies one step to the rows in active: picks a placement among options  #
+    # (a (rows, C) mask over the placement ids in columns), updates weights,   #
+    # occupancy, used ships and placements, and kills rows without options.    #
+    ############################################################################
+    def step(self, state, active, columns, mask, rng):
+        occupied, used, log_weights, alive, placed = state
+        rows = np.flatnonzero(active)
+        if len(rows) == 0:
+            return
+        count, choice = self.choose(mask[rows], rng)
+        dead = count == 0
+        alive[rows[dead]] = False
+        rows, count, choice = rows[~dead], count[~dead], choice[~dead]
+        chosen = columns[choice] if columns.ndim == 1 else columns[rows, choice]
+        log_weights[rows] += np.log(count)
+        occupied[rows[:, None], self.indices[chosen]] = True
+        occupied[:, -1] = False
+        used[rows, self.ship_of[chosen]] = True
+        placed[rows, self.ship_of[chosen]] = chosen
+
+    ############################################################################
+    # Draws a batch of k fleets. Returns their log weights (-inf if no         #
+    # consistent fleet was reached), the (k, cells) occupancy matrices of all  #
+    # ships and of the ships covering hits, which ships were drawn freely, and #
+    # the (k, cells) matrix of the cells whose shot would sink a ship.         #
+    ############################################################################
+    def draw(self, k, rng):
+        cells = self.board_size * self.board_size
+        occupied = np.zeros((k, cells + 1), dtype=bool)
+        used = np.zeros((k, len(self.fleet)), dtype=bool)
+        log_weights = np.zeros(k)
+        alive = np.ones(k, dtype=bool)
+        placed = np.zeros((k, len(self.fleet)), dtype=int)
+        state = (occupied, used, log_weights, alive, placed)
+
+        # 1. the ship of every sink
+        for options in self.sink_options:
+            mask = ~used[:, self.ship_of[options]] & ~occupied[:, self.indices[options]].any(axis=2)
+            self.step(state, alive.copy(), options, mask, rng)
+        sunk = occupied[:, :cells].copy()
+
+        # 2. the ship covering the first uncovered hit, until none is left
+        options = self.hit_options
+        for _ in range(len(self.fleet)):
+            uncovered = self.hit & ~occupied[:, :cells]
+            need = alive & uncovered.any(axis=1)
+            if not need.any():
+                break
+            first = uncovered.argmax(axis=1)
+            mask = (self.cover[options][:, first].T & ~used[:, self.ship_of[options]]
+                    & ~occupied[:, self.indices[options]].any(axis=2))
+            self.step(state, need, options, mask, rng)
+        alive &= ~(self.hit & ~occupied[:, :cells]).any(axis=1)
+        targeted = occupied[:, :cells] & ~sunk
+        free = ~used
+
+        # 3. every ship left
+        for ship, options in enumerate(self.ship_options):
+            active = alive & ~used[:, ship]
+            mask = ~occupied[:, self.indices[options]].any(axis=2)
+            self.step(state, active, options, mask, rng)
+
+        # a ship left with one cell not shot at sinks there (the sentinel counts as shot at)
+        untried = ~np.append(self.tried, True)[self.indices[placed]]
+        rows, ships = np.nonzero(untried.sum(axis=2) == 1)
+        sinkable = np.zeros((k, cells + 1), dtype=bool)
+        sinkable[rows, self.indices[placed[rows, ships], untried[rows, ships].argmax(axis=1)]] = True
+
+        log_weights[~alive] = -np.inf
+        return log_weights, occupied[:, :cells], targeted, free, sinkable[:, :cells]
+
+    ############################################################################
+    # Samples until the sample budget is spent or the deadline (a              #
+    # time.perf_counter() value) has passed, whichever comes first; at least   #
+    # one batch is always drawn, a small one under a deadline. Returns a       #
+    # Posterior.                                                               #
+    ############################################################################
+    def run(self, samples=2000, deadline=None, rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        start = time.perf_counter()
+        cells = self.board_size * self.board_size
+
+        # weighted sums, kept relative to the largest log weight seen (shift)
+        shift = -np.inf
+        occupancy = np.zeros(cells)
+        targeting = np.zeros(cells)
+        sinking = np.zeros(cells)
+        total = 0.0
+        squares = 0.0
+        free_cells = 0.0
+        # weight of the fleets by which ships they drew freely
+        fleets = defaultdict(float)
+        drawn = 0
+        batch = self.batch if deadline is None else min(self.batch, FIRST_BATCH)
+        while drawn < samples:
+            log_weights, occupied, targeted, free, sinkable = self.draw(min(batch, samples - drawn), rng)
+            drawn += len(log_weights)
+            top = log_weights.max()
+            if top > shift:
+                scale = np.exp(shift - top) if shift > -np.inf else 0.0
+                occupancy *= scale
+                targeting *= scale
+                sinking *= scale
+                total *= scale
+                free_cells *= scale
+                squares *= scale * scale
+                for key in fleets:
+                    fleets[key] *= scale
+                shift = top
+            if top > -np.inf:
+                weights = np.exp(log_weights - shift)
+                occupancy += weights.dot(occupied)
+                targeting += weights.dot(targeted)
+                sinking += weights.dot(sinkable)
+                free_cells += weights.dot(free.dot(self.fleet))
+                total += weights.sum()
+                squares += weights.dot(weights)
+                for row in np.flatnonzero(weights > 0):
+                    fleets[free[row].tobytes()] += weights[row]
+            if deadline is not None:
+                now = time.perf_counter()
+                batch = min(self.batch, 2 * batch, int((deadline - now) * drawn / (now - start)))
+                if batch < 1:
+                    break
+
+        if total == 0:
+            return Posterior(None, drawn, 0.0, 0.0, time.perf_counter() - start, None, 0.0, None, None)
+        p = occupancy / total
+        p[self.tried] = 0
+        target = targeting / total
+        target[self.tried] = 0
+        sink = sinking / total
+        sink[self.tried] = 0
+        count = float(np.exp(shift) * total / drawn)
+        free = np.frombuffer(max(fleets, key=fleets.get), dtype=bool)
+        fleet = [ship_size for ship_size, drawn_freely in zip(self.fleet, free) if drawn_freely]
+        return Posterior(p.reshape(self.board_size, self.board_size), drawn, total * total / squares,
+                         count, time.perf_counter() - start, target.reshape(self.board_size, self.board_size),
+                         free_cells / total, fleet, sink.reshape(self.board_size, self.board_size))
@@ -0,0 +1,91 @@
+from collections import namedtuple
+import numpy as np
+
+################################################################################
+# Returns the flat indices of the cells of a ship with top left corner (x, y). #
+# orientation: 0 = horizontal (along the y-axis), 1 = vertical (along x-axis)  #
+################################################################################
+def ship_cells(x, y, orientation, ship_size, board_size):
+    step = 1 if orientation == 0 else board_size
+    return [int(x) * board_size + int(y) + step * i for i in range(ship_size)]
+
+################################################################################
+# STATE CLASS: Immutable snapshot of what one solution instance knows about    #
+# the board. Spawning a hypothesis only builds a new tuple from a few integer  #
+# operations, and everything that did not change (the fleet, the other masks)  #
+# is shared with the parent instead of copied.                                 #
+# ---------------------------------------------------------------------------- #
+# FIELDS:                                                                      #
+# - miss:       Bitmask of missed cells, bit x * board_size + y is (x, y).     #
+# - hit:        Bitmask of cells hit but not sunk.                             #
+# - sunk:       Bitmask of cells that belong to a sunk ship.                   #
+# - fleet:      Tuple of the sizes of the remaining ships.                     #
+# - board_size: The width and height of the board.                             #
+################################################################################
+class State(namedtuple('State', ['miss', 'hit', 'sunk', 'fleet', 'board_size'])):
+    __slots__ = ()
+
+    ############################################################################
+    # Returns the state of a game that has not started.                        #
+    ############################################################################
+    @classmethod
+    def empty(cls, fleet, board_size):
+        return cls(0, 0, 0, tuple(fleet), board_size)
+
+    ############################################################################
+    # Returns the state after a shot at (x, y) with result M, H or S. A cell   #
+    # only ever holds its latest value, like writing into the game state.      #
+    ############################################################################
+    def shoot(self, x, y, result):
+        bit = 1 << (int(x) * self.board_size + int(y))
+        miss, hit, sunk = self.miss & ~bit, self.hit & ~bit, self.sunk & ~bit
+        match result:
+            case 'M':
+                miss |= bit
+            case 'H':
+                hit |= bit
+            case 'S':
+                sunk |= bit
+        return State(miss, hit, sunk, self.fleet, self.board_size)
+
+    ############################################################################
+    # Returns the state with the cells of mask marked sunk, without changing   #
+    # the fleet (a ship that is already accounted for).                        #
+    ############################################################################
+    def confirm(self, mask):
+        return State(self.miss & ~mask, self.hit & ~mask, self.sunk | mask, self.fleet, self.board_size)
+
+    ############################################################################
+    # Returns the state with the cells of mask marked sunk and one ship of     #
+    # ship_size removed from the fleet.                                        #
+    ############################################################################
+    def sink(self, mask, ship_size):
+        i = self.fleet.index(ship_size)
+        fleet = self.fleet[:i] + self.fleet[i + 1:]
+        return State(self.miss & ~mask, self.hit & ~mask, self.sunk | mask, fleet, self.board_size)
+
+    ############################################################################
+    # Returns a hashable key that is equal for equal positions, whatever       #
+    # order the fleet is stored in.                                            #
+    ############################################################################
+    def key(self):
+        return (self.miss, self.hit, self.sunk, tuple(sorted(self.fleet)), self.board_size)
+
+    ############################################################################
+    # Returns the number of hit (not sunk) cells.                              #
+    ############################################################################
+    def hit_count(self):
+        return self.hit.bit_count()
+
+    ############################################################################
+    # Expands the masks into the game state array:                             #
+    # 0: not tried, 1: missed, 2: hit, 3: sunk                                 #
+    ############################################################################
+    def array(self):
+        cells = self.board_size * self.board_size
+        nbytes = (cells + 7) // 8
+        game_state = np.zeros(cells, dtype=int)
+        for value, mask in ((1, self.miss), (2, self.hit), (3, self.sunk)):
+            bits = np.unpackbits(np.frombuffer(mask.to_bytes(nbytes, 'little'), dtype=np.uint8), bitorder='little')
+            game_state[bits[:cells].astype(bool)] = value
+        return game_state.reshape(self.board_size, self.board_size)
@@ -0,0 +1,101 @@
+import numpy as np
+from battleship_scripts.state import State
+
+################################################################################
+# Board symmetry.                                                              #
+# ---------------------------------------------------------------------------- #
+# A square board with a fleet of straight ships looks the same under the 8     #
+# rotations and reflections of the square, so a position and its mirror image  #
+# have the same counts and mirrored probability maps. Transform t maps cell    #
+# (x, y) to PERMUTATIONS[t][x * board_size + y] (with m = board_size - 1):     #
+# 0: (x, y)      1: (y, m-x)    2: (m-x, m-y)  3: (m-y, x)                     #
+# 4: (x, m-y)    5: (m-x, y)    6: (y, x)      7: (m-y, m-x)                   #
+# Only the count cache uses it: maps and moves are not cached, so none are     #
+# mapped back.                                                                 #
+################################################################################
+TRANSFORMS = 8
+
+PERMUTATIONS = {}
+BYTE_TABLES = {}
+
+################################################################################
+# Returns the (8, board_size ** 2) array of cell permutations.                 #
+################################################################################
+def get_permutations(board_size):
+    if board_size not in PERMUTATIONS:
+        m = board_size - 1
+        x, y = np.divmod(np.arange(board_size * board_size), board_size)
+        images = [(x, y), (y, m - x), (m - x, m - y), (m - y, x),
+                  (x, m - y), (m - x, y), (y, x), (m - y, m - x)]
+        PERMUTATIONS[board_size] = np.array([ix * board_size + iy for ix, iy in images])
+    return PERMUTATIONS[board_size]
+
+################################################################################
+# Returns, for every transform, byte position and byte value, the transformed  #
+# bits of that byte, so a bitmask is transformed with one lookup per byte.     #
+################################################################################
+def get_byte_tables(board_size):
+    if board_size not in BYTE_TABLES:
+        cells = board_size * board_size
+        tables = []
+        for permutation in get_permutations(board_size):
+            table = []
+            for position in range((cells + 7) // 8):
+                row = [0] * 256
+                for value in range(1, 256):
+                    for bit in range(8):
+                        cell = position * 8 + bit
+                        if value >> bit & 1 and cell < cells:
+                            row[value] |= 1 << int(permutation[cell])
+                table.append(row)
+            tables.append(table)
+        BYTE_TABLES[board_size] = tables
+    return BYTE_TABLES[board_size]
+
+################################################################################
+# Returns the bitmask with every bit moved by the transform's byte table.      #
+################################################################################
+def transform_mask(mask, table, nbytes):
+    result = 0
+    for position, value in enumerate(mask.to_bytes(nbytes, 'little')):
+        if value:
+            result |= table[position][value]
+    return result
+
+################################################################################
+# Returns the state with transform t applied to every mask.                    #
+################################################################################
+def transform_state(state, t):
+    table = get_byte_tables(state.board_size)[t]
+    nbytes = (state.board_size * state.board_size + 7) // 8
+    return State(transform_mask(state.miss, table, nbytes), transform_mask(state.hit, table, nbytes),
+                 transform_mask(state.sunk, table, nbytes), state.fleet, state.board_size)
+
+################################################################################
+# Returns (canonical, t): the representative of the state's symmetry class     #
+# and the transform that maps the state onto it. The representative has the    #
+# smallest (miss, hit, sunk) masks; hit and sunk are only transformed for the  #
+# transforms that tie on the miss mask.                                        #
+################################################################################
+def canonicalize(state):
+    tables = get_byte_tables(state.board_size)
+    nbytes = (state.board_size * state.board_size + 7) // 8
+
+    candidates = list(range(TRANSFORMS))
+    keys = {t: () for t in candidates}
+    for mask in (state.miss, state.hit, state.sunk):
+        if len(candidates) == 1:
+            break
+        for t in candidates:
+            keys[t] += (transform_mask(mask, tables[t], nbytes),)
+        best_key = min(keys[t] for t in candidates)
+        candidates = [t for t in candidates if keys[t] == best_key]
+
+    t = candidates[0]
+    return transform_state(state, t), t
+
+################################################################################
+# Returns a cache key that is equal for every symmetric copy of a position.    #
+################################################################################
+def canonical_key(state):
+    return canonicalize(state)[0].key()
@@ -0,0 +1,68 @@
+import argparse
+import random
+import time
+from hangman_scripts import colors
+from hangman_scripts import arpa
+
+################################################################################
+# Language model query benchmark.                                              #
+# ---------------------------------------------------------------------------- #
+# Times getUnigramProb, getBigramProb and getSentenceProb on random words of   #
+# the model's vocabulary with the NumPy backend (hangman_scripts/arpa.py), and #
+# with the SWIG srilm module if it can be imported, so that the per-call cost  #
+# of both can be compared on the same queries. Also prints the largest         #
+# difference between the answers of the two backends.                          #
+################################################################################
+
+################################################################################
+# Returns the calls per second of query over every argument tuple of queries,  #
+# and its answers.                                                             #
+################################################################################
+def throughput(query, lm, queries):
+    start = time.perf_counter()
+    answers = [query(lm, *arguments) for arguments in queries]
+    return len(queries) / (time.perf_counter() - start), answers
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark language model queries.")
+    parser.add_argument("lm", help="ARPA language model file")
+    parser.add_argument("--order", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backends = [("numpy", arpa)]
+    try:
+        import srilm
+        backends.append(("swig", srilm))
+    except Exception as error:
+        print(f"{colors.BLUE + colors.BOLD}SWIG srilm unavailable ({error}), timing the NumPy backend only.")
+
+    start = time.perf_counter()
+    lm = arpa.initLM(args.order)
+    arpa.readLM(lm, args.lm)
+    print(f"{colors.BLUE + colors.BOLD}Read {args.lm} in {time.perf_counter() - start:.1f}s: "
+          f"{colors.YELLOW}{', '.join(f'{arpa.howManyNgrams(lm, n)} {n}-grams' for n in sorted(lm.probs))}.")
+
+    rng = random.Random(args.seed)
+    words = [word for word in lm.words[:len(lm.probs[1])] if not word.startswith('<')]
+    tests = {
+        'getUnigramProb': [(rng.choice(words),) for _ in range(args.queries)],
+        'getBigramProb': [(f"{rng.choice(words)} {rng.choice(words)}",) for _ in range(args.queries)],
+        'getSentenceProb': [(" ".join(rng.choices(words, k=6)), 6) for _ in range(args.queries // 10)],
+    }
+
+    models = {"numpy": lm}
+    for name, backend in backends[1:]:
+        models[name] = backend.initLM(args.order)
+        backend.readLM(models[name], args.lm)
+
+    for test, queries in tests.items():
+        answers = {}
+        for name, backend in backends:
+            rate, answers[name] = throughput(getattr(backend, test), models[name], queries)
+            print(f"{colors.BLUE + colors.BOLD}{test:16} {name:6} {colors.YELLOW}{rate:12.0f} calls/s, "
+                  f"{1e6 / rate:8.2f} us/call")
+        if len(answers) > 1:
+            difference = max(abs(a - b) for a, b in zip(answers["numpy"], answers["swig"]))
+            print(f"{colors.BLUE + colors.BOLD}{test:16} {colors.YELLOW}largest difference {difference:.2e}")
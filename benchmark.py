@@ -0,0 +1,261 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from battleship_scripts import colors
+from battleship_scripts.cache import TranspositionTable
+import battleship
+
+################################################################################
+# Battleship solver benchmark.                                                 #
+# ---------------------------------------------------------------------------- #
+# Two parts, both deterministic so that runs can be diffed:                    #
+# - games:     full games on boards from Board.generate with fixed seeds,      #
+#              played in one process, for games/s, moves/s, per-move latency   #
+#              and the peak size of the hypothesis tree.                       #
+# - positions: a curated library of hard hit-mode positions (several live      #
+#              sink hypotheses, unresolved hits), stored as shot histories in  #
+#              bench_positions.json. Every position is replayed into a fresh   #
+#              game, then one eval_state and the counts of its hypotheses      #
+#              (get_total_states with a cold cache) are timed, and the peak    #
+#              memory of replaying and evaluating it is measured.              #
+# Results are written as JSON; --compare checks them against an earlier run.   #
+################################################################################
+
+POSITIONS_FILE = "bench_positions.json"
+
+# metrics compared by --compare, and whether higher is better
+METRICS = {
+    'games_per_second': True,
+    'moves_per_second': True,
+    'move_p50_ms': False,
+    'move_p99_ms': False,
+    'replay_ms': False,
+    'count_ms': False,
+    'eval_ms': False,
+    'peak_kib': False,
+}
+
+################################################################################
+# Plays the seeded games and returns their throughput, latency and tree size.  #
+################################################################################
+def bench_games(games, seed, board_size, ship_sizes, engine):
+    seeds = np.random.SeedSequence(seed).spawn(games)
+    cache = TranspositionTable()
+    times = []
+    moves = 0
+    peak_instances = 0
+    peak_tracker_bytes = 0
+    start = time.perf_counter()
+    for game_seed in seeds:
+        board = battleship.Board(True, np.random.default_rng(game_seed), board_size, ship_sizes)
+        game = battleship.Game(board, cache, engine=engine, rng=np.random.default_rng(game_seed.spawn(1)[0]))
+        moves += game.run(verbose=False)
+        times += game.solution.move_times
+        stats = game.tree_stats()
+        peak_instances = max(peak_instances, stats['peak'])
+        peak_tracker_bytes = max(peak_tracker_bytes, stats['tracker_bytes'])
+    elapsed = time.perf_counter() - start
+
+    times = np.array(times) * 1000
+    return {
+        'games': games,
+        'moves': moves,
+        'seconds': elapsed,
+        'games_per_second': games / elapsed,
+        'moves_per_second': moves / elapsed,
+        'move_p50_ms': float(np.percentile(times, 50)),
+        'move_p99_ms': float(np.percentile(times, 99)),
+        'peak_instances': peak_instances,
+        'peak_tracker_bytes': peak_tracker_bytes,
+    }
+
+################################################################################
+# Returns a game with the shots of a position replayed into it.                #
+################################################################################
+def replay(position):
+    board = battleship.Board(True, np.random.default_rng(0), position['board_size'], position['ships'])
+    game = battleship.Game(board, engine='exact')
+    for x, y, result in position['history']:
+        game.solution.move((x, y), result)
+    return game
+
+################################################################################
+# Returns the live hypotheses of a game without hypotheses of their own.       #
+################################################################################
+def leaves(game):
+    return [instance for instance in game.solution.walk() if not instance.instances]
+
+################################################################################
+# Times one position: replaying its shots (every move counts its hypotheses),  #
+# one eval_state right after, as in a game, and the best of repeats for        #
+# counting every leaf hypothesis with a cold cache. Memory is the peak of a    #
+# second replay and evaluation, traced apart since tracing slows them down.    #
+################################################################################
+def bench_position(position, repeats):
+    tracemalloc.start()
+    replay(position).solution.eval_state()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    game = replay(position)
+    replay_time = time.perf_counter() - start
+    start = time.perf_counter()
+    game.solution.eval_state()
+    eval_time = time.perf_counter() - start
+
+    live = leaves(game)
+    count_times = []
+    for _ in range(repeats):
+        game.cache = TranspositionTable()
+        start = time.perf_counter()
+        for instance in live:
+            instance.get_total_states()
+        count_times.append(time.perf_counter() - start)
+
+    return {
+        'name': position['name'],
+        'hypotheses': game.solution.size - 1,
+        'hits': max(instance.state.hit_count() for instance in live),
+        'replay_ms': replay_time * 1000,
+        'count_ms': min(count_times) * 1000,
+        'eval_ms': eval_time * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+################################################################################
+# Picks hard positions from seeded exact games: after every move, the number   #
+# of live hypotheses and the most unresolved hits of any of them. The hardest  #
+# moment of every game reached within max_seconds of play is kept, so that     #
+# replaying it stays cheap, and the hardest positions overall are returned.    #
+################################################################################
+def curate(count, seed, board_size, ship_sizes, max_seconds):
+    candidates = []
+    game_seed = seed
+    while len(candidates) < 4 * count:
+        board = battleship.Board(True, np.random.default_rng(game_seed), board_size, ship_sizes)
+        game = battleship.Game(board, engine='exact')
+        solution = game.solution
+        best = None
+        start = time.perf_counter()
+        while not solution.check_win() and time.perf_counter() - start < max_seconds:
+            p = solution.eval_state()
+            solution.move(np.unravel_index(p.argmax(), p.shape))
+            if time.perf_counter() - start > max_seconds:
+                break
+            live = leaves(game)
+            score = (len(live), max(instance.state.hit_count() for instance in live))
+            if score[0] > 1 and (best is None or score > best[0]):
+                best = (score, len(game.history))
+        if best is not None:
+            history = [(int(x), int(y), result) for x, y, result in game.history[:best[1]]]
+            candidates.append((best[0], {
+                'name': f"{board_size}x{board_size}-seed{game_seed}-move{best[1]}",
+                'board_size': board_size,
+                'ships': list(ship_sizes),
+                'history': history,
+            }))
+        game_seed += 1
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    return [position for _, position in candidates[:count]]
+
+################################################################################
+# Prints every metric next to the baseline and returns the regressions, the    #
+# metrics that got worse by more than threshold (a fraction).                  #
+################################################################################
+def compare(results, baseline, threshold):
+    rows = [('games', key, results['games'].get(key), baseline['games'].get(key)) for key in METRICS]
+    old_positions = {position['name']: position for position in baseline['positions']}
+    for position in results['positions']:
+        old = old_positions.get(position['name'], {})
+        rows += [(position['name'], key, position.get(key), old.get(key)) for key in METRICS]
+
+    regressions = []
+    for name, key, new, old in rows:
+        if new is None or not old:
+            continue
+        change = new / old - 1
+        worse = -change if METRICS[key] else change
+        color = colors.RED if worse > threshold else colors.GREEN
+        print(f"{colors.BLUE}{name:<28} {key:<18} {old:12.3f} -> {new:12.3f} {color}{change:+.1%}{colors.RESET}")
+        if worse > threshold:
+            regressions.append((name, key, change))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Battleship solver.")
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--board-size", type=int, default=battleship.BOARD_SIZE)
+    parser.add_argument("--ships", default=",".join(map(str, battleship.DEFAULT_SHIP_SIZES)),
+                        help="comma separated ship sizes, e.g. 6,5,5,4,4,3,3,2")
+    parser.add_argument("--engine", choices=["auto", "exact", "sampled"], default="exact")
+    parser.add_argument("--positions", default=POSITIONS_FILE, help="position library, '' to skip positions")
+    parser.add_argument("--repeats", type=int, default=5, help="timings per position (the best is kept)")
+    parser.add_argument("--curate", type=int, default=0,
+                        help="instead of benchmarking, append this many hard positions of the board to the library")
+    parser.add_argument("--curate-seconds", type=float, default=2.0,
+                        help="only curate positions reached within this many seconds of play")
+    parser.add_argument("--output", default="", help="optional JSON file for the results")
+    parser.add_argument("--compare", default="", help="optional earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+    ship_sizes = [int(size) for size in args.ships.split(",")]
+
+    if args.curate:
+        try:
+            with open(args.positions) as f:
+                library = json.load(f)
+        except FileNotFoundError:
+            library = []
+        library += curate(args.curate, args.seed, args.board_size, ship_sizes, args.curate_seconds)
+        with open(args.positions, "w") as f:
+            json.dump(library, f, indent=1)
+        print(f"{colors.BLUE + colors.BOLD}Wrote {len(library)} positions to {colors.YELLOW}{args.positions}.")
+        sys.exit()
+
+    results = {
+        'meta': {
+            'board_size': args.board_size,
+            'ships': ship_sizes,
+            'seed': args.seed,
+            'engine': args.engine,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'games': bench_games(args.games, args.seed, args.board_size, ship_sizes, args.engine),
+        'positions': [],
+    }
+    games = results['games']
+    print(f"{colors.BLUE + colors.BOLD}{games['games']} games, {games['moves']} moves: "
+          f"{colors.YELLOW}{games['games_per_second']:.2f} games/s, {games['moves_per_second']:.1f} moves/s, "
+          f"p50 {games['move_p50_ms']:.2f} ms, p99 {games['move_p99_ms']:.2f} ms, "
+          f"peak {games['peak_instances']} instances.")
+
+    if args.positions:
+        with open(args.positions) as f:
+            library = json.load(f)
+        for position in library:
+            result = bench_position(position, args.repeats)
+            results['positions'].append(result)
+            print(f"{colors.BLUE}{result['name']:<28} {colors.YELLOW}{result['hypotheses']:4d} hypotheses, "
+                  f"{result['hits']} hits: replay {result['replay_ms']:8.2f} ms, count {result['count_ms']:8.2f} ms, eval {result['eval_ms']:8.2f} ms, "
+                  f"peak {result['peak_kib']:8.0f} KiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{colors.RED + colors.BOLD}{len(regressions)} regression(s) above {args.threshold:.0%}.")
+            sys.exit(1)
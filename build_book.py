@@ -0,0 +1,40 @@
+import argparse
+from numpy import unravel_index
+from battleship_scripts import colors
+from battleship_scripts.opening_book import save_book
+from battleship_scripts.state import State
+import battleship
+
+################################################################################
+# Opening book builder.                                                        #
+# ---------------------------------------------------------------------------- #
+# Until the first hit, the solver's move only depends on the misses so far.    #
+# Because the solver always plays the same move in the same position, the      #
+# miss-only positions it can reach form a single line: play the best move,     #
+# assume it missed, repeat. Every position on that line up to the given depth  #
+# is evaluated once and written with its best move and density map.            #
+################################################################################
+def build(depth, board_size=battleship.BOARD_SIZE, ship_sizes=battleship.DEFAULT_SHIP_SIZES):
+    game = battleship.Game(battleship.Board(True, board_size=board_size, ship_sizes=ship_sizes))
+    state = State.empty(ship_sizes, board_size)
+    entries = []
+    for i in range(depth):
+        p = battleship.Solution(game, state).eval_state()
+        move = unravel_index(p.argmax(), p.shape)
+        entries.append((state.miss, move, p))
+        state = state.shoot(move[0], move[1], 'M')
+    return entries
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the Battleship opening book.")
+    parser.add_argument("--depth", type=int, default=20, help="number of misses to look ahead")
+    parser.add_argument("--board-size", type=int, default=battleship.BOARD_SIZE)
+    parser.add_argument("--ships", default=",".join(map(str, battleship.DEFAULT_SHIP_SIZES)),
+                        help="comma separated ship sizes, e.g. 6,5,5,4,4,3,3,2")
+    parser.add_argument("--output", default="opening_book.npy")
+    args = parser.parse_args()
+
+    ship_sizes = [int(size) for size in args.ships.split(",")]
+    entries = build(args.depth, args.board_size, ship_sizes)
+    save_book(args.output, entries, ship_sizes, args.board_size)
+    print(f"{colors.BLUE + colors.BOLD}Wrote {len(entries)} positions to {colors.YELLOW}{args.output}.")
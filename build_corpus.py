@@ -0,0 +1,31 @@
+import argparse
+import time
+import numpy as np
+from battleship_scripts import colors
+from battleship_scripts.corpus import save_corpus
+import battleship
+
+################################################################################
+# Board corpus builder.                                                        #
+# ---------------------------------------------------------------------------- #
+# Draws boards uniformly from every valid fleet (see corpus.py) and writes     #
+# them as a memory-mappable .npy for simulate.py --corpus, so that solvers can #
+# be compared on exactly the same boards.                                      #
+################################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build a corpus of uniformly random Battleship boards.")
+    parser.add_argument("--boards", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--board-size", type=int, default=battleship.BOARD_SIZE)
+    parser.add_argument("--ships", default=",".join(map(str, battleship.DEFAULT_SHIP_SIZES)),
+                        help="comma separated ship sizes, e.g. 6,5,5,4,4,3,3,2")
+    parser.add_argument("--output", default="boards.npy")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ship_sizes = [int(size) for size in args.ships.split(",")]
+    save_corpus(args.output, args.boards, ship_sizes, args.board_size, np.random.default_rng(args.seed))
+    elapsed = time.perf_counter() - start
+    print(f"{colors.BLUE + colors.BOLD}Wrote {args.boards} boards to {colors.YELLOW}{args.output}"
+          f"{colors.BLUE} in {elapsed:.1f}s.")
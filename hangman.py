@@ -1,13 +1,22 @@
 from hangman_scripts import colors, scripts
+from hangman_scripts.word_index import WordIndex
 from collections import defaultdict
+import os
 import numpy as np
-from srilm import *
+from hangman_scripts.arpa import initLM, readLM, getUnigramProb, getSentenceProbs
 
 ################################################################################
 # Initialization.                                                              #
 # VOCAB: The list of available vocabulary.                                     #
+# INDEX: The WordIndex of the vocabulary of every length, built on first use.  #
+# UNIGRAMS: The unigram log10 probability of every word of VOCAB, in a NumPy   #
+#           array parallel to the list of every length.                        #
+# UNIGRAMS_PATH: The file the unigram log10 probabilities are saved to.        #
 ################################################################################
 VOCAB = defaultdict(lambda: [])
+INDEX = {}
+UNIGRAMS = defaultdict(lambda: np.zeros(0))
+UNIGRAMS_PATH = 'vocab_unigrams.npy'
 np.set_printoptions(precision=3)
 n = initLM(5)
 
@@ -21,6 +30,11 @@ n = initLM(5)
 # progress: List of characters in the phrase, with █ as the unknown character. #
 # order: A few preset letters that motivates stage one.                        #
 # fails: A list of phrases that have failed in guessing.                       #
+# words: The word slots of the phrase, as filters with █ for unknown letters.  #
+# spans: The (start, length) of every word slot in progress.                   #
+# slots: The set of viable words (see word_index.py) of every span, with the   #
+#        number of letters used when it was last narrowed.                     #
+# viable_indices: The indices in VOCAB of the viable words of every slot.      #
 ################################################################################
 class Hangman():
 
@@ -38,6 +52,7 @@ class Hangman():
         self.order = ["e", "a", "r", "i", "o", "t", "n", "s"]
         
         self.fails = []
+        self.slots = {}
         
         print(f"{colors.BOLD + colors.BLUE}STAGE ZERO | Current Phrase: " + (" ".join(self.progress)))
         self.make_move(" ", False, "blank")
@@ -92,9 +107,7 @@ class Hangman():
             for i in range(len(self.viable)):
                 # create a unigram probability list
                 print(f"{colors.BOLD + colors.YELLOW}STAGE TWO | {self.words[i]} has {len(self.viable[i])} possibilities.")
-                p = np.zeros((len(self.viable[i])), dtype=float)
-                for j in range(len(self.viable[i])):
-                    p[j] = 10 ** getUnigramProb(n, self.viable[i][j])
+                p = 10 ** UNIGRAMS[str(len(self.words[i]))][self.viable_indices[i]]
                 # normalize it
                 p /= sum(p)
                 
@@ -147,10 +160,7 @@ class Hangman():
                 phrases.remove(failed_phrase)
             
         # create probability array
-        p = np.zeros((len(phrases)), dtype=float)
-            
-        for i in range(len(phrases)):
-            p[i] = 10 ** getSentenceProb(n, phrases[i], len(self.words))
+        p = 10 ** getSentenceProbs(n, phrases, len(self.words))
             
         # normalize probabilities
         p /= sum(p)
@@ -227,12 +237,24 @@ class Hangman():
         
     ############################################################################
     # Finds all possible words sorted in format of the secret phrase           #
+    # - Viable sets only shrink, so the set of a slot kept from the last call  #
+    #   is narrowed by the letters used since. A slot whose span changed (the  #
+    #   words were split again) starts over from the whole vocabulary.         #
     ############################################################################
     def evaluate_available_words(self):
         viable = []
-        for word in self.words:
-            viable.append(scripts.getFilteredList(word, VOCAB[str(len(word))], self.letters_used))
+        viable_indices = []
+        slots = {}
+        for span, word in zip(self.spans, self.words):
+            index = get_index(len(word))
+            used, candidates = self.slots.get(span, (0, None))
+            bits = index.match(word, self.letters_used[used:], candidates)
+            slots[span] = (len(self.letters_used), bits)
+            viable_indices.append(index.to_indices(bits))
+            viable.append([index.words[j] for j in viable_indices[-1]])
+        self.slots = slots
         self.viable = viable
+        self.viable_indices = viable_indices
 
     ############################################################################
     # Make the move by prompting the user                                      #
@@ -300,6 +322,15 @@ class Hangman():
                 
         if self.words[-1][-1] in '.?!':
             self.words[-1] = self.words[-1][:-1]
+
+        # words are in order and only separated by spaces and commas
+        phrase = ''.join(self.progress)
+        self.spans = []
+        start = 0
+        for word in self.words:
+            start = phrase.index(word, start)
+            self.spans.append((start, len(word)))
+            start += len(word)
     
     # update the progress left
     def progress_updater(self, guess, positions):
@@ -307,17 +338,46 @@ class Hangman():
             self.progress[pos] = guess
             self.letters_left -= 1
         return " ".join(self.progress)
+
+################################################################################
+# Returns the WordIndex of the vocabulary of the given length.                 #
+################################################################################
+def get_index(length):
+    if str(length) not in INDEX:
+        INDEX[str(length)] = WordIndex(VOCAB[str(length)])
+    return INDEX[str(length)]
+
+################################################################################
+# Returns the unigram log10 probability of every word of the vocabulary, in    #
+# order. They are saved to path and read back while path is newer than the     #
+# vocabulary and language model files, instead of asking the model per word.   #
+################################################################################
+def load_unigrams(words, path, sources):
+    if os.path.exists(path) and all(os.path.getmtime(path) >= os.path.getmtime(source) for source in sources):
+        logprobs = np.load(path)
+        if len(logprobs) == len(words):
+            return logprobs
+    logprobs = np.array([getUnigramProb(n, word) for word in words], dtype=float)
+    np.save(path, logprobs)
+    return logprobs
     
 if __name__ == '__main__':
     
     print(f"{colors.BOLD + colors.BLUE}Welcome to Hangman! Loading data...")
     # Load vocabulary list
-    for line in open('vocab.txt').readlines():
-        word = line.strip()
+    words = [line.strip() for line in open('vocab.txt').readlines()]
+    lines = defaultdict(lambda: [])
+    for i, word in enumerate(words):
         VOCAB[str(len(word))].append(word)
+        lines[str(len(word))].append(i)
 
     # Read language model --> set to 1e-5 pruned probabilities at order 5
     readLM(n, "bnc-pruned-3.lm")
+
+    # unigram probabilities of the vocabulary, split like it by length
+    logprobs = load_unigrams(words, UNIGRAMS_PATH, ['vocab.txt', "bnc-pruned-3.lm"])
+    for length, positions in lines.items():
+        UNIGRAMS[length] = logprobs[positions]
     print(f"{colors.BOLD + colors.GREEN}Data loaded!")
     
     # Begin!
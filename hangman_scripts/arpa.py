@@ -0,0 +1,365 @@
+import math
+import numpy as np
+
+################################################################################
+# ARPA n-gram language models in NumPy.                                        #
+# ---------------------------------------------------------------------------- #
+# A drop-in for the SWIG srilm module: the same initLM, readLM and get*Prob    #
+# functions, backed by arrays instead of a compiled SRILM. Every word of the   #
+# 1-grams gets an id, its row in the 1-gram arrays. The n-grams of every       #
+# higher order are a (count, n) array of ids, sorted by a 64-bit hash of the   #
+# ids with parallel log10 probability and backoff weight arrays. A lookup is a #
+# binary search for the hash and a check of the ids, so it is always exact.    #
+#                                                                              #
+# Probabilities back off as in SRILM (Ngram::wordProbBO): the context is       #
+# walked from the most recent word back for as long as it is an n-gram of the  #
+# model, and the longest n-gram ending in the word wins, plus the backoff      #
+# weights of the longer contexts walked past it. Like SRILM, log10 values are  #
+# returned as 32-bit floats, -99 (BIGNEG) stands for probability zero, and     #
+# sentences are scored between <s> and </s>, with out-of-vocabulary words      #
+# skipped and counted.                                                         #
+################################################################################
+
+# what swig-srilm returns for probability zero
+BIGNEG = -99.0
+# FNV-1a prime, mixing one id at a time into the hash of an n-gram
+PRIME = 0x100000001b3
+MASK = (1 << 64) - 1
+# the model made last by initLM, whose vocabulary getIndexForWord and getWordForIndex use (as swig-srilm)
+LAST = None
+
+################################################################################
+# Returns the hash of every row of a (count, n) array of ids.                  #
+################################################################################
+def hash_ids(ids):
+    hashes = np.zeros(len(ids), dtype=np.uint64)
+    for column in ids.T:
+        hashes = (hashes ^ (column.astype(np.uint64) + np.uint64(1))) * np.uint64(PRIME)
+    return hashes
+
+################################################################################
+# Returns the hash of one n-gram of ids, equal to hash_ids of it as a row.     #
+################################################################################
+def hash_ngram(ngram):
+    value = 0
+    for id in ngram:
+        value = ((value ^ (id + 1)) * PRIME) & MASK
+    return value
+
+################################################################################
+# ARPALM CLASS: An n-gram backoff language model read from an ARPA file.       #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - order:   The order given to initLM. Longer n-grams of a file are skipped.  #
+# - vocab:   The id of every word. Words added by getIndexForWord are past the #
+#            1-grams and have no probability.                                  #
+# - words:   The word of every id.                                             #
+# - unk:     The id of <unk>, which every word not in vocab is looked up as.   #
+# - keys:    keys[n] is the sorted array of the hashes of the n-grams.         #
+# - ids:     ids[n] is the (count, n) array of the ids of the n-grams, in the  #
+#            order of keys[n] (1-grams are their own ids).                     #
+# - probs:   probs[n] is the log10 probability of every n-gram.                #
+# - bows:    bows[n] is the log10 backoff weight of every n-gram (0 if none).  #
+################################################################################
+class ArpaLM():
+
+    def __init__(self, order):
+        self.order = order
+        self.vocab = {}
+        self.words = []
+        self.unk = None
+        self.keys = {}
+        self.ids = {1: np.zeros((0, 1), dtype=int)}
+        self.probs = {1: np.zeros(0, dtype=np.float32)}
+        self.bows = {1: np.zeros(0, dtype=np.float32)}
+        for word in ('</s>', '<s>', '<unk>'):
+            self.add_word(word)
+
+    ############################################################################
+    # Returns the id of a word, adding it to the vocabulary if it is new.      #
+    ############################################################################
+    def add_word(self, word):
+        if word not in self.vocab:
+            self.vocab[word] = len(self.words)
+            self.words.append(word)
+        if word == '<unk>':
+            self.unk = self.vocab[word]
+        return self.vocab[word]
+
+    ############################################################################
+    # Reads an ARPA file, replacing whatever the model held. n-grams above the #
+    # order of the model are skipped.                                          #
+    ############################################################################
+    def read(self, path):
+        sections = {}
+        current = None
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('\\'):
+                    current = None
+                    if line.endswith('-grams:'):
+                        current = int(line[1:line.index('-')])
+                        sections[current] = []
+                    continue
+                if current is not None and current <= self.order:
+                    sections[current].append(line.split())
+
+        # 1-gram ids are their rows, the words of higher orders are looked up in them
+        self.__init__(self.order)
+        ones = sections.get(1, [])
+        self.words = [fields[1] for fields in ones]
+        self.vocab = {word: id for id, word in enumerate(self.words)}
+        for word in ('</s>', '<s>', '<unk>'):
+            self.add_word(word)
+        self.ids[1] = np.arange(len(ones))[:, None]
+        self.probs[1] = np.array([float(fields[0]) for fields in ones], dtype=np.float32)
+        self.bows[1] = np.array([float(fields[2]) if len(fields) > 2 else 0.0 for fields in ones], dtype=np.float32)
+
+        for n in sorted(sections):
+            if n == 1:
+                continue
+            rows = sections[n]
+            ids = np.array([[self.add_word(word) for word in fields[1:n + 1]] for fields in rows],
+                           dtype=np.uint32).reshape(len(rows), n)
+            probs = np.array([float(fields[0]) for fields in rows], dtype=np.float32)
+            bows = np.array([float(fields[n + 1]) if len(fields) > n + 1 else 0.0 for fields in rows],
+                            dtype=np.float32)
+            keys = hash_ids(ids)
+            order = np.argsort(keys, kind='stable')
+            self.keys[n], self.ids[n], self.probs[n], self.bows[n] = keys[order], ids[order], probs[order], bows[order]
+        return len(sections) > 0
+
+    ############################################################################
+    # Returns the row of an n-gram (a tuple of ids) in its order, or None.     #
+    ############################################################################
+    def find(self, ngram):
+        n = len(ngram)
+        if n == 1:
+            return ngram[0] if ngram[0] < len(self.probs[1]) else None
+        if n not in self.keys:
+            return None
+        keys = self.keys[n]
+        key = hash_ngram(ngram)
+        row = int(keys.searchsorted(np.uint64(key)))
+        while row < len(keys) and int(keys[row]) == key:
+            if tuple(self.ids[n][row].tolist()) == ngram:
+                return row
+            row += 1
+        return None
+
+    ############################################################################
+    # Returns the rows of a (count, n) array of n-grams of ids in their order, #
+    # -1 for the n-grams (or ids, negative) not in the model.                  #
+    ############################################################################
+    def find_many(self, ngrams):
+        n = ngrams.shape[1]
+        rows = np.full(len(ngrams), -1)
+        candidates = (ngrams >= 0).all(axis=1)
+        if n == 1:
+            candidates &= ngrams[:, 0] < len(self.probs[1])
+            rows[candidates] = ngrams[candidates, 0]
+            return rows
+        if n not in self.keys or len(self.keys[n]) == 0:
+            return rows
+
+        # hashes that collide sit next to each other, so the rows after the first are checked as well
+        keys = self.keys[n]
+        hashes = hash_ids(np.where(candidates[:, None], ngrams, 0))
+        first = keys.searchsorted(hashes)
+        step = 0
+        while candidates.any():
+            row = np.minimum(first + step, len(keys) - 1)
+            candidates &= (first + step < len(keys)) & (keys[row] == hashes)
+            found = candidates & (self.ids[n][row] == ngrams).all(axis=1)
+            rows[found] = row[found]
+            candidates &= ~found
+            step += 1
+        return rows
+
+    ############################################################################
+    # Returns log10 P(word | context) of ids, the context most recent word     #
+    # first, or -inf if the word has probability zero.                         #
+    ############################################################################
+    def word_prob(self, word, context):
+        row = self.find((word,))
+        logp = float(self.probs[1][row]) if row is not None else -math.inf
+        bow = 0.0
+        history = ()
+        for previous in context[:self.order - 1]:
+            history = (previous,) + history
+            node = self.find(history)
+            if node is None:
+                break
+            bow += float(self.bows[len(history)][node])
+            row = self.find(history + (word,))
+            if row is not None:
+                logp = float(self.probs[len(history) + 1][row])
+                bow = 0.0
+        return float(np.float32(logp + bow))
+
+    ############################################################################
+    # Returns the id of a word as SRILM looks it up: <unk> if it is not in the #
+    # vocabulary.                                                              #
+    ############################################################################
+    def index(self, word):
+        return self.vocab.get(word, self.unk)
+
+    ############################################################################
+    # Returns the log10 probability of a sentence (at most length words)       #
+    # between <s> and </s>, its number of words and its out-of-vocabulary and  #
+    # zero-probability words, which are left out of the probability.           #
+    ############################################################################
+    def sentence_stats(self, sentence, length=None):
+        words = sentence.split()
+        if length is not None:
+            words = words[:length]
+        ids = [self.index('<s>')] + [self.index(word) for word in words] + [self.index('</s>')]
+        prob, oovs, zeros = 0.0, 0, 0
+        for i in range(1, len(ids)):
+            logp = self.word_prob(ids[i], ids[i - 1::-1])
+            if logp == -math.inf and ids[i] == self.unk:
+                oovs += 1
+            elif logp == -math.inf:
+                zeros += 1
+            else:
+                prob += logp
+        return prob, len(words), oovs, zeros
+
+    ############################################################################
+    # Returns the log10 probability of every sentence (at most length words),  #
+    # as sentence_stats, with every sentence scored at once: the backoff walk  #
+    # of one position of every sentence is a few lookups of find_many.         #
+    ############################################################################
+    def sentence_probs(self, sentences, length=None):
+        tokens = [sentence.split()[:length] for sentence in sentences]
+        width = max([len(words) for words in tokens], default=0) + 2
+        start, end, vocab, unk = self.index('<s>'), self.index('</s>'), self.vocab, self.unk
+        ids = np.array([[start] + [vocab.get(word, unk) for word in words] + [end] + [-1] * (width - len(words) - 2)
+                        for words in tokens], dtype=int).reshape(len(tokens), width)
+
+        probs = np.zeros(len(tokens))
+        for i in range(1, width):
+            word = ids[:, i]
+            row = self.find_many(word[:, None])
+            logp = np.where(row >= 0, self.probs[1][row], -np.inf)
+            bow = np.zeros(len(tokens))
+            walking = word >= 0
+            for k in range(1, min(i, self.order - 1) + 1):
+                node = self.find_many(ids[:, i - k:i])
+                walking &= node >= 0
+                if not walking.any():
+                    break
+                bow[walking] += self.bows[k][node[walking]]
+                row = self.find_many(ids[:, i - k:i + 1])
+                found = walking & (row >= 0)
+                if found.any():
+                    logp[found] = self.probs[k + 1][row[found]]
+                    bow[found] = 0
+            logp = (logp + bow).astype(np.float32)
+            # out-of-vocabulary and zero-probability words (and padding) add nothing
+            scored = (word >= 0) & np.isfinite(logp)
+            probs[scored] += logp[scored]
+        return probs
+
+################################################################################
+# Perplexity from a total log10 probability, as SRILM computes it.             #
+################################################################################
+def perplexity(prob, words, oovs, zeros, sentences):
+    denominator = words - oovs - zeros + sentences
+    if denominator <= 0:
+        return -1.0
+    return 10 ** (-prob / denominator)
+
+################################################################################
+# The swig-srilm surface.                                                      #
+################################################################################
+
+def initLM(order):
+    global LAST
+    LAST = ArpaLM(order)
+    return LAST
+
+def deleteLM(lm):
+    lm.__init__(lm.order)
+
+def getIndexForWord(word):
+    return LAST.add_word(word)
+
+def getWordForIndex(index):
+    return LAST.words[index]
+
+def readLM(lm, path):
+    try:
+        return int(lm.read(path))
+    except OSError:
+        print(f"Error:: Could not open file {path}")
+        return 0
+
+################################################################################
+# log10 P(word | context), the context most recent word first.                 #
+################################################################################
+def getWordProb(lm, word, context):
+    logp = lm.word_prob(lm.index(word), [lm.index(previous) for previous in context])
+    return BIGNEG if logp == -math.inf else logp
+
+################################################################################
+# log10 probability of the last word of an n-gram string given the others.     #
+################################################################################
+def getNgramProb(lm, ngram, order):
+    words = ngram.split()
+    if len(words) != order:
+        print(f"Error: Given order ({order}) does not match number of words ({len(words)})")
+        return 0
+    return getWordProb(lm, words[-1], words[-2::-1])
+
+def getUnigramProb(lm, word):
+    return getNgramProb(lm, word, 1)
+
+def getBigramProb(lm, ngram):
+    return getNgramProb(lm, ngram, 2)
+
+def getTrigramProb(lm, ngram):
+    return getNgramProb(lm, ngram, 3)
+
+def getSentenceProb(lm, sentence, length):
+    return lm.sentence_stats(sentence, length)[0]
+
+################################################################################
+# getSentenceProb of every sentence of a list, as a NumPy array (not in        #
+# swig-srilm).                                                                 #
+################################################################################
+def getSentenceProbs(lm, sentences, length):
+    return lm.sentence_probs(sentences, length)
+
+def getSentencePpl(lm, sentence, length):
+    return perplexity(*lm.sentence_stats(sentence, length), 1)
+
+def numOOVs(lm, sentence, length):
+    return lm.sentence_stats(sentence, length)[2]
+
+################################################################################
+# Returns the total log10 probability, words, OOVs, zero probabilities and     #
+# sentences of a file of one sentence per line.                                #
+################################################################################
+def corpusStats(lm, path):
+    prob, words, oovs, zeros, sentences = 0.0, 0, 0, 0, 0
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.split():
+                continue
+            stats = lm.sentence_stats(line)
+            prob, words, oovs, zeros = prob + stats[0], words + stats[1], oovs + stats[2], zeros + stats[3]
+            sentences += 1
+    return prob, words, oovs, zeros, sentences
+
+def getCorpusProb(lm, path):
+    return corpusStats(lm, path)[0]
+
+def getCorpusPpl(lm, path):
+    return perplexity(*corpusStats(lm, path))
+
+def howManyNgrams(lm, order):
+    return len(lm.probs.get(order, []))
@@ -30,84 +30,119 @@ def getFilteredList(filter, wordlist, used_letters):
 # Retrieves the entropy of a list. filtered_list is a probability array.       #
 ################################################################################
 def getEntropy(filtered_list):
-    entropy = 0
-    total = 0
-
-    for freq in filtered_list:
-        if freq != 0:
-            entropy -= freq * math.log2(freq)
-            total += freq
+    freqs = np.asarray(filtered_list, dtype=float)
+    freqs = freqs[freqs != 0]
+    total = freqs.sum()
     if total == 0:
         print("Impossible sequence found.")
         return 0
-    entropy /= total
-    entropy += math.log2(total)
+    return -(freqs * np.log2(freqs)).sum() / total + np.log2(total)
+
+################################################################################
+# Encodes a wordlist as a (words, width) matrix of letter codes, 0 past the    #
+# end of shorter words. Returns the matrix and the letter of every code.       #
+################################################################################
+def encodeWords(wordlist, width=0):
+    width = max([width, 1] + [len(word) for word in wordlist])
+    points = np.array(wordlist, dtype=f'<U{width}').view(np.uint32).reshape(len(wordlist), width)
+    counts = np.bincount(points.ravel())
+    counts[0] = 1
+    letters = np.flatnonzero(counts)
+    table = np.zeros(len(counts), dtype=np.uint8 if len(letters) <= 256 else np.uint16)
+    table[letters] = np.arange(len(letters))
+    return table[points], [chr(letter) for letter in letters]
 
-    return entropy
+################################################################################
+# Returns the bitmask of the positions of a letter code in every word, as a    #
+# (words, chunks) uint64 array: bit j % 64 of chunk j // 64 is set if the word #
+# has the letter at position j. columns is the transposed code matrix.         #
+################################################################################
+def letterMask(columns, code, chunks):
+    mask = np.zeros((columns.shape[1], chunks), dtype=np.uint64)
+    for j in range(len(columns)):
+        mask[:, j // 64] |= (columns[j] == code).astype(np.uint64) << np.uint64(j % 64)
+    return mask
+
+################################################################################
+# Returns an integer code for every row of a uint64 matrix, equal for equal    #
+# rows: the row itself if it is one number, else its bytes.                    #
+################################################################################
+def rowCodes(rows):
+    if rows.shape[1] == 1:
+        return rows.ravel()
+    return np.ascontiguousarray(rows).view(np.dtype((np.void, 8 * rows.shape[1]))).ravel()
 
 ################################################################################
 # Calculates the entropy of wordlist with respective probability array p.      #
+# - Words are encoded as a matrix of letter codes, and every letter as the     #
+#   bitmask of its positions in every word: the pattern it would reveal. With  #
+#   the length of the word (patterns of different lengths never match) this is #
+#   one code, and the words are grouped by code with np.unique and bincount.   #
+# - The words left if the letter is absent are the words matching the filter   #
+#   (as matchesFilter) that do not have it at an unknown position.             #
 ################################################################################
 def calculate(filter, wordlist, used_letters, p):
+    p = np.asarray(p, dtype=float)
 
     # calculate the current entropy of all possible items
     currentEntropy = getEntropy(p)
-
-    alphabetList = defaultdict(lambda: defaultdict(lambda: 0))
-    entropyList = defaultdict(lambda: defaultdict(lambda: 0))
     infoList = defaultdict(lambda: currentEntropy)
-    
-    # sum up frequencies
-    for i in range(len(wordlist)):
-        
-        k = wordlist[i]
-        v = p[i]
-        
-        if v == 0: continue
-        # iterate through only unique characters
-        for letter in set(k):
-            # calculate the filter for that letter
-            pattern = ''.join([letter if letter == otherLetter else "█" for otherLetter in k])
-
-            # add the frequency value to this pattern to find total.
-            alphabetList[letter][pattern] += v
-
-            # initial calculation. need to divide by total and add log of total.
-            entropyList[letter][pattern] -= v * math.log2(v)
-
-    for letter, dictionary in alphabetList.items():
-
-        if letter in used_letters: continue
-
-        # sum of the totals for the letter
-        total = sum(dictionary.values())
-
-        expected_present_entropy = 0
-
-        for pattern, freq in dictionary.items():
-            if freq == 0: continue
-            # completes the entropy calculation.
-            entropyList[letter][pattern] /= freq
-            entropyList[letter][pattern] += math.log2(freq)
-            expected_present_entropy += freq / total * entropyList[letter][pattern]
+    if len(wordlist) == 0:
+        return infoList
+
+    words, letters = encodeWords(wordlist, len(filter))
+    codes = {letter: code for code, letter in enumerate(letters) if code}
+    unknown = np.array([letter == "█" for letter in filter] + [False] * (words.shape[1] - len(filter)))
+    revealed = np.flatnonzero(~unknown[:len(filter)])
+
+    # the length of every word goes in the top bits of its patterns, if the lengths differ
+    lengths = (words != 0).sum(axis=1)
+    lengthBits = int(lengths.max()).bit_length() if lengths.min() != lengths.max() else 0
+    lengthCodes = np.zeros(len(words), dtype=np.uint64)
+    if lengthBits:
+        lengthCodes = lengths.astype(np.uint64) << np.uint64(64 - lengthBits)
+    chunks = -(-(words.shape[1] + lengthBits) // 64)
+    columns = np.ascontiguousarray(words.T)
+    unknownMask = letterMask(unknown[:, None], True, chunks)[0]
+
+    # words matching the filter given the used letters
+    matching = lengths == len(filter)
+    matching &= (words[:, revealed] == [codes.get(filter[i], -1) for i in revealed]).all(axis=1)
+    matching &= ~np.isin(words[:, unknown], [codes[letter] for letter in used_letters if letter in codes]).any(axis=1)
+
+    # v log v of every word, the initial entropy calculation of its pattern
+    nonzero = p != 0
+    plogp = np.zeros_like(p)
+    plogp[nonzero] = p[nonzero] * np.log2(p[nonzero])
+
+    for code in np.flatnonzero(np.bincount(words[nonzero].ravel(), minlength=len(letters))):
+        letter = letters[code]
+        if code == 0 or letter in used_letters: continue
+
+        mask = letterMask(columns, code, chunks)
+        present = mask.any(axis=1)
+        rows = present & nonzero
+
+        # total frequency and entropy of every pattern of the letter
+        keys = mask[rows]
+        keys[:, -1] |= lengthCodes[rows]
+        _, patterns = np.unique(rowCodes(keys), return_inverse=True)
+        freq = np.bincount(patterns, p[rows])
+        total = freq.sum()
+        expected_present_entropy = (freq * np.log2(freq) - np.bincount(patterns, plogp[rows])).sum() / total
 
         # we've found expected entropy if the letter exists, now we must consider if it does not
-        temp_used_letters = used_letters + [letter]
-        absent_filtered_list = getFilteredList(filter, wordlist, temp_used_letters)
-        ap = np.zeros((len(absent_filtered_list)), dtype=float)
-        
-        count = 0
-        for i in range(len(wordlist)):
-            if wordlist[i] in absent_filtered_list:
-                ap[count] = p[i]
-                count += 1
-        ap /= sum(ap)
+        if letter in filter:
+            absent = matching & ~(mask & unknownMask).any(axis=1)
+        else:
+            absent = matching & ~present
+        ap = p[absent]
 
         expected_absent_entropy = 0
-        if absent_filtered_list:
-            expected_absent_entropy = getEntropy(ap)
+        if ap.sum() > 0:
+            expected_absent_entropy = getEntropy(ap / ap.sum())
 
         # set the values for expected information gained
         infoList[letter] -= expected_present_entropy * total + expected_absent_entropy * (1 - total)
 
-    return infoList
\ No newline at end of file
+    return infoList
@@ -0,0 +1,107 @@
+import numpy as np
+
+################################################################################
+# Positional letter index of a word list of one length.                        #
+# ---------------------------------------------------------------------------- #
+# Word j of the list is bit j of a Python int, so a set of words is one int.   #
+# For every position i and letter L the index keeps the set of words with L at #
+# i, and for every letter the set of words that hold it anywhere. A filter     #
+# such as "th█ █a█" with used letters is then a few ANDs and AND-NOTs:         #
+# - a revealed letter L at i keeps the words with L at i,                      #
+# - a used letter that is not revealed removes the words that hold it,         #
+# - a used letter that is revealed removes the words that hold it at any       #
+#   unknown position (every position of it would have been revealed).          #
+# This is exactly scripts.matchesFilter over the whole list at once.           #
+################################################################################
+
+# sets of at most this many words are decoded bit by bit
+SPARSE = 32
+
+################################################################################
+# WORDINDEX CLASS: The words of one length and their letter bitsets.           #
+# ---------------------------------------------------------------------------- #
+# INSTANCE VARIABLES:                                                          #
+# - words:      The word list, in its original order.                          #
+# - length:     The length of every word.                                      #
+# - all:        The set of every word.                                         #
+# - positional: positional[i][L] is the set of words with letter L at i.       #
+# - present:    present[L] is the set of words holding letter L.               #
+################################################################################
+class WordIndex():
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.length = len(self.words[0]) if self.words else 0
+        self.all = (1 << len(self.words)) - 1
+        self.positional = [{} for _ in range(self.length)]
+        self.present = {}
+
+        letters = np.array([list(word) for word in self.words], dtype=str).reshape(len(self.words), self.length)
+        for i in range(self.length):
+            for letter in np.unique(letters[:, i]):
+                self.positional[i][letter] = self.to_bits(letters[:, i] == letter)
+        for letter in np.unique(letters):
+            self.present[letter] = self.to_bits((letters == letter).any(axis=1))
+
+    def __len__(self):
+        return len(self.words)
+
+    ############################################################################
+    # Returns the set of the words flagged True in a boolean array.            #
+    ############################################################################
+    def to_bits(self, flags):
+        return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+    ############################################################################
+    # Returns the indices of the words in a set, in ascending order.           #
+    ############################################################################
+    def to_indices(self, bits):
+        if not bits:
+            return np.zeros(0, dtype=int)
+        # a few words are cheaper to pick off one bit at a time than to unpack the whole list
+        if bits.bit_count() <= SPARSE:
+            indices = []
+            while bits:
+                low = bits & -bits
+                indices.append(low.bit_length() - 1)
+                bits ^= low
+            return np.array(indices, dtype=int)
+        flags = np.unpackbits(np.frombuffer(bits.to_bytes((len(self.words) + 7) // 8, 'little'), dtype=np.uint8),
+                              bitorder='little')
+        return np.flatnonzero(flags[:len(self.words)])
+
+    ############################################################################
+    # Returns the set of the words matching the filter (█ for an unknown       #
+    # letter) given the used letters, within the set candidates (every word by #
+    # default). Candidates that already match an earlier filter of the same    #
+    # word only need the letters used since.                                   #
+    ############################################################################
+    def match(self, filter, used_letters, candidates=None):
+        if len(filter) != self.length:
+            return 0
+        bits = self.all if candidates is None else candidates
+        unknown = [i for i in range(self.length) if filter[i] == "█"]
+
+        for i in range(self.length):
+            if i not in unknown:
+                bits &= self.positional[i].get(filter[i], 0)
+        for letter in used_letters:
+            if letter in filter:
+                for i in unknown:
+                    bits &= ~self.positional[i].get(letter, 0)
+            else:
+                bits &= ~self.present.get(letter, 0)
+        return bits
+
+    ############################################################################
+    # Returns the words in a set, in the order of the word list.               #
+    ############################################################################
+    def select(self, bits):
+        return [self.words[j] for j in self.to_indices(bits)]
+
+    ############################################################################
+    # Returns the words matching the filter given the used letters, in the     #
+    # order of the word list (as scripts.getFilteredList).                     #
+    ############################################################################
+    def filter(self, filter, used_letters, candidates=None):
+        return self.select(self.match(filter, used_letters, candidates))
@@ -0,0 +1,181 @@
+import argparse
+import time
+import numpy as np
+from functools import partial
+from multiprocessing import Pool
+from battleship_scripts import colors
+from battleship_scripts.cache import TranspositionTable
+from battleship_scripts.opening_book import OpeningBook
+from battleship_scripts.metrics import Metrics
+from battleship_scripts.corpus import BoardCorpus
+import battleship
+
+################################################################################
+# Headless Monte Carlo simulation of the Battleship solver.                    #
+# ---------------------------------------------------------------------------- #
+# Games are spread across a process pool. Every game gets its own RNG stream   #
+# spawned from one root seed, so a run is reproducible no matter how many      #
+# workers play it or in which order. Workers return only the move count and    #
+# the per-move timings, which are merged into the same move histogram that     #
+# Battleship.results holds, and the Metrics of the game when instrumented.     #
+################################################################################
+
+# state counts only depend on the position, so every worker keeps one table for all of its games
+CACHE = TranspositionTable()
+BOOK = None
+CORPUS = None
+
+################################################################################
+# Runs once in every worker: memory-maps the opening book and the board        #
+# corpus, if there are any.                                                    #
+################################################################################
+def init_worker(book_path, corpus_path=""):
+    global BOOK, CORPUS
+    if book_path:
+        BOOK = OpeningBook(book_path)
+    if corpus_path:
+        CORPUS = BoardCorpus(corpus_path)
+
+################################################################################
+# Plays one game on a freshly generated board without printing anything, or    #
+# on board number index of the corpus if there is one.                         #
+# Returns the number of moves, the time taken by every move, whether every     #
+# move was degraded by the move budget, and the Metrics of the game if         #
+# instrumented (else None).                                                    #
+# The sampler draws from a stream spawned from the seed of the board.          #
+################################################################################
+def play_game(seed, board_size=battleship.BOARD_SIZE, ship_sizes=battleship.DEFAULT_SHIP_SIZES,
+              engine='auto', samples=battleship.SAMPLES, move_budget=None, instrumented=False, index=None,
+              targeting='probability'):
+    ships = None if CORPUS is None else CORPUS.ships(index)
+    board = battleship.Board(True, np.random.default_rng(seed), board_size, ship_sizes, ships)
+    rng = np.random.default_rng(seed.spawn(1)[0])
+    metrics = Metrics() if instrumented else None
+    game = battleship.Game(board, CACHE, BOOK, engine, samples, rng=rng, move_budget=move_budget, metrics=metrics,
+                           targeting=targeting)
+    moves = game.run(verbose=False)
+    return (moves, np.array(game.solution.move_times, dtype=np.float32),
+            np.array(game.solution.move_degraded, dtype=bool), metrics)
+
+################################################################################
+# Plays game number index with its seed, for pool.imap.                        #
+################################################################################
+def play_indexed(job, **kwargs):
+    index, seed = job
+    return play_game(seed, index=index, **kwargs)
+
+################################################################################
+# Plays the given number of games and returns the move histogram, the move     #
+# count of every game and the per-move timings and degraded flags of every     #
+# game (in game order).                                                        #
+# processes: Number of worker processes, None for one per core.                #
+# book_path: Optional opening book file built by build_book.py.                #
+# corpus_path: Optional board corpus built by build_corpus.py; game i plays    #
+#              board i instead of one generated from its seed. Its geometry    #
+#              and fleet replace board_size and ship_sizes.                    #
+# board_size, ship_sizes: Geometry and fleet of every game.                    #
+# engine, samples: Evaluation engine of every game (see battleship.Game).      #
+# targeting:   Shot choice of every game (see battleship.Game).                #
+# move_budget: Optional seconds every move may take (see battleship.Game).     #
+# metrics:     Optional Metrics to instrument every game and add them up in.   #
+# trace:       Optional open file for the JSON-lines trace of every move of    #
+#              every game (needs metrics).                                     #
+################################################################################
+def simulate(games, processes=None, seed=0, chunksize=8, book_path="",
+             board_size=battleship.BOARD_SIZE, ship_sizes=battleship.DEFAULT_SHIP_SIZES,
+             engine='auto', samples=battleship.SAMPLES, move_budget=None, metrics=None, trace=None,
+             corpus_path="", targeting='probability'):
+    if corpus_path:
+        corpus = BoardCorpus(corpus_path)
+        if len(corpus) < games:
+            raise ValueError(f"the corpus has {len(corpus)} boards, {games} games were asked for")
+        board_size, ship_sizes = corpus.board_size, corpus.fleet
+    seeds = np.random.SeedSequence(seed).spawn(games)
+    play = partial(play_indexed, board_size=board_size, ship_sizes=list(ship_sizes), engine=engine, samples=samples,
+                   move_budget=move_budget, instrumented=metrics is not None, targeting=targeting)
+    results = np.zeros(board_size * board_size + 1, dtype=int)
+    moves = np.zeros(games, dtype=int)
+    timings = []
+    degraded = []
+
+    with Pool(processes, init_worker, (book_path, corpus_path)) as pool:
+        for i, (count, times, flags, game_metrics) in enumerate(pool.imap(play, enumerate(seeds), chunksize)):
+            results[count] += 1
+            moves[i] = count
+            timings.append(times)
+            degraded.append(flags)
+            if game_metrics is not None:
+                # the trace is streamed out game by game, only the totals are kept
+                if trace is not None:
+                    game_metrics.write_trace(trace, game=i)
+                game_metrics.moves = []
+                metrics.merge(game_metrics)
+    return results, moves, timings, degraded
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless Battleship solver simulation.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--board-size", type=int, default=battleship.BOARD_SIZE)
+    parser.add_argument("--ships", default=",".join(map(str, battleship.DEFAULT_SHIP_SIZES)),
+                        help="comma separated ship sizes, e.g. 6,5,5,4,4,3,3,2")
+    parser.add_argument("--engine", choices=["auto", "exact", "sampled"], default="auto")
+    parser.add_argument("--targeting", choices=["probability", "information", "both"], default="probability",
+                        help="shot choice; both plays the same games with each and compares them")
+    parser.add_argument("--samples", type=int, default=battleship.SAMPLES, help="sample budget of sampled evaluations")
+    parser.add_argument("--move-budget", type=float, default=None, help="optional seconds per move")
+    parser.add_argument("--book", default="", help="optional opening book built by build_book.py")
+    parser.add_argument("--corpus", default="", help="optional board corpus built by build_corpus.py")
+    parser.add_argument("--output", default="", help="optional .npz file for the histogram, moves and timings")
+    parser.add_argument("--trace", default="", help="optional JSON-lines file for the instrumented trace of every move")
+    parser.add_argument("--prometheus", default="", help="optional Prometheus textfile for the instrumented totals")
+    args = parser.parse_args()
+
+    if args.targeting == "both" and (args.output or args.trace or args.prometheus):
+        parser.error("--targeting both does not write --output, --trace or --prometheus files")
+
+    ship_sizes = [int(size) for size in args.ships.split(",")]
+    targetings = ["probability", "information"] if args.targeting == "both" else [args.targeting]
+    played = {}
+    for targeting in targetings:
+        start = time.perf_counter()
+        metrics = Metrics() if args.trace or args.prometheus else None
+        trace = open(args.trace, "w") if args.trace else None
+        results, moves, timings, degraded = simulate(args.games, args.processes, args.seed, book_path=args.book,
+                                                     board_size=args.board_size, ship_sizes=ship_sizes,
+                                                     engine=args.engine, samples=args.samples,
+                                                     move_budget=args.move_budget, metrics=metrics, trace=trace,
+                                                     corpus_path=args.corpus, targeting=targeting)
+        elapsed = time.perf_counter() - start
+        if trace is not None:
+            trace.close()
+        if args.prometheus:
+            metrics.write_prometheus(args.prometheus)
+
+        if len(targetings) > 1:
+            print(f"{colors.BLUE + colors.BOLD}Targeting: {colors.YELLOW}{targeting}")
+        battleship.print_results(results)
+        total_moves = int(moves.sum())
+        print(f"{colors.BLUE + colors.BOLD}Played {args.games} games ({total_moves} moves) in {elapsed:.1f}s: "
+              f"{colors.YELLOW}{args.games / elapsed:.2f} games/s, {total_moves / elapsed:.1f} moves/s.")
+        all_times = np.concatenate(timings) if timings else np.zeros(0, dtype=np.float32)
+        all_degraded = np.concatenate(degraded) if degraded else np.zeros(0, dtype=bool)
+        if total_moves:
+            print(f"{colors.BLUE + colors.BOLD}Per move: {colors.YELLOW}"
+                  f"p50 {np.percentile(all_times, 50) * 1000:.1f} ms, "
+                  f"p99 {np.percentile(all_times, 99) * 1000:.1f} ms, max {all_times.max() * 1000:.1f} ms, "
+                  f"{all_degraded.sum()} degraded.")
+        played[targeting] = moves
+
+        if args.output:
+            np.savez(args.output, results=results, moves=moves, times=all_times, degraded=all_degraded,
+                     offsets=np.cumsum(moves) - moves)
+
+    if len(targetings) > 1:
+        # both runs played the same boards in the same order, so the games are compared in pairs
+        difference = played["information"] - played["probability"]
+        error = difference.std(ddof=1) / np.sqrt(len(difference)) if len(difference) > 1 else 0.0
+        print(f"{colors.BLUE + colors.BOLD}Information - probability: {colors.YELLOW}"
+              f"{difference.mean():+.2f} ± {error:.2f} moves per game, "
+              f"{(difference < 0).sum()} games shorter, {(difference > 0).sum()} longer.")
@@ -0,0 +1,62 @@
+import os
+import pytest
+from hangman_scripts import arpa
+
+################################################################################
+# Tests of the NumPy ARPA backend against a trigram model small enough that    #
+# every expected log10 probability below is worked out by hand from            #
+# fixtures/trigram.arpa.                                                       #
+################################################################################
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'trigram.arpa')
+
+@pytest.fixture
+def lm():
+    lm = arpa.initLM(3)
+    assert arpa.readLM(lm, FIXTURE)
+    return lm
+
+def test_counts(lm):
+    assert [arpa.howManyNgrams(lm, n) for n in (1, 2, 3)] == [5, 4, 2]
+
+def test_longest_ngram(lm):
+    assert arpa.getWordProb(lm, 'a', ['<s>']) == pytest.approx(-0.3)
+    assert arpa.getWordProb(lm, 'b', ['a', '<s>']) == pytest.approx(-0.2)
+    assert arpa.getTrigramProb(lm, 'a b c') == pytest.approx(-0.25)
+
+def test_backoff(lm):
+    # a b </s> is missing: bow(a b) + P(</s> | b)
+    assert arpa.getWordProb(lm, '</s>', ['b', 'a']) == pytest.approx(-0.2 - 0.5)
+    # a c is missing: bow(a) + P(c)
+    assert arpa.getBigramProb(lm, 'a c') == pytest.approx(-0.3 - 1.2)
+    # a b a and b a are missing: bow(a b) + bow(b) + P(a)
+    assert arpa.getTrigramProb(lm, 'a b a') == pytest.approx(-0.2 - 0.2 - 0.7)
+    # b c has no backoff weight and c </s> is missing: bow(c) + P(</s>)
+    assert arpa.getWordProb(lm, '</s>', ['c', 'b']) == pytest.approx(-0.1 - 1.0)
+
+def test_oov(lm):
+    assert arpa.getWordProb(lm, 'zebra', ['a']) == arpa.BIGNEG
+    assert arpa.getUnigramProb(lm, 'zebra') == arpa.BIGNEG
+    # an unknown context word stops the walk at the unigram
+    assert arpa.getWordProb(lm, 'b', ['zebra', 'a']) == pytest.approx(-0.9)
+
+def test_sentence_prob(lm):
+    assert arpa.getSentenceProb(lm, 'a b c', 10) == pytest.approx(-0.3 - 0.2 - 0.25 - 0.1 - 1.0)
+    # the OOV is skipped and counted, and breaks the context after it
+    assert arpa.getSentenceProb(lm, 'a zebra b', 10) == pytest.approx(-0.3 - 0.9 - 0.5)
+    assert arpa.numOOVs(lm, 'a zebra b', 10) == 1
+    # only the first length words are scored
+    assert arpa.getSentenceProb(lm, 'a b c', 2) == pytest.approx(-0.3 - 0.2 - 0.2 - 0.5)
+
+def test_sentence_probs(lm):
+    sentences = ['a b c', 'a zebra b', 'c', 'b a b c a', '']
+    for length in (None, 2, 10):
+        probs = arpa.getSentenceProbs(lm, sentences, length)
+        expected = [arpa.getSentenceProb(lm, sentence, length) for sentence in sentences]
+        assert probs == pytest.approx(expected)
+
+def test_corpus_prob(lm, tmp_path):
+    corpus = tmp_path / 'corpus.txt'
+    corpus.write_text('a b c\n\na zebra b\n')
+    assert arpa.getCorpusProb(lm, str(corpus)) == pytest.approx(-1.85 - 1.7)
+    # 6 words, 1 OOV and 2 sentences
+    assert arpa.getCorpusPpl(lm, str(corpus)) == pytest.approx(10 ** ((1.85 + 1.7) / 7))
@@ -0,0 +1,55 @@
+import numpy as np
+import battleship
+from battleship_scripts.counting import count_fleets
+from battleship_scripts.state import State, ship_cells
+
+################################################################################
+# Tests of the exact fleet counts against brute-force enumeration of every     #
+# fleet on boards small enough to list them all.                               #
+################################################################################
+
+def brute_force(game_state, fleet):
+    board_size = game_state.shape[0]
+    flat = game_state.reshape(-1)
+    placements = {}
+    for ship_size in set(fleet):
+        placements[ship_size] = []
+        for x in range(board_size):
+            for y in range(board_size):
+                for orientation, fits in ((0, y + ship_size <= board_size), (1, x + ship_size <= board_size)):
+                    cells = set(ship_cells(x, y, orientation, ship_size, board_size))
+                    if fits and all(flat[cell] in (0, 2) for cell in cells):
+                        placements[ship_size].append(cells)
+    hits = set(np.flatnonzero(flat == 2))
+
+    def count(ships, used):
+        if not ships:
+            return int(hits <= used)
+        return sum(count(ships[1:], used | cells) for cells in placements[ships[0]] if not cells & used)
+    return count(list(fleet), set())
+
+def random_states(board_size, n, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        game_state = rng.choice(4, size=(board_size, board_size), p=[0.8, 0.1, 0.07, 0.03])
+        yield game_state
+
+def test_count_fleets_empty():
+    for board_size, fleet in ((4, [3, 2]), (5, [3, 3, 2]), (5, [4, 3, 2, 2])):
+        game_state = np.zeros((board_size, board_size), dtype=int)
+        assert count_fleets(game_state, fleet, board_size) == brute_force(game_state, fleet)
+
+def test_count_fleets_positions():
+    for fleet in ([3, 2], [3, 3, 2], [4, 3, 2, 2]):
+        for game_state in random_states(5, 15, len(fleet)):
+            assert count_fleets(game_state, fleet, 5) == brute_force(game_state, fleet)
+
+def test_count_states_hit_mode():
+    board = battleship.Board(True, np.random.default_rng(0), board_size=5, ship_sizes=[3, 3, 2])
+    game = battleship.Game(board, engine='exact')
+    for game_state in random_states(5, 20, 1):
+        state = State.empty([3, 3, 2], 5)
+        for (x, y), value in np.ndenumerate(game_state):
+            if value:
+                state = state.shoot(x, y, 'MHS'[value - 1])
+        assert game.count_states(state) == brute_force(game_state, [3, 3, 2])
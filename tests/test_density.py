@@ -0,0 +1,71 @@
+import numpy as np
+from battleship_scripts.density import DensityTracker, density_map, fleet_counts, fleet_density
+from battleship_scripts.state import ship_cells
+
+################################################################################
+# Tests of the density kernels against the per-placement loop they replace:    #
+# every placement of every ship that covers no missed or sunk cell adds        #
+# 50 * sum ** 2 + 1 to the cells it covers, sum being the values it covers.    #
+################################################################################
+
+def reference(game_state, fleet):
+    board_size = game_state.shape[0]
+    flat = game_state.reshape(-1)
+    p = np.zeros(board_size * board_size, dtype=np.int64)
+    for ship_size in fleet:
+        for x in range(board_size):
+            for y in range(board_size):
+                for orientation, fits in ((0, y + ship_size <= board_size), (1, x + ship_size <= board_size)):
+                    if not fits:
+                        continue
+                    cells = ship_cells(x, y, orientation, ship_size, board_size)
+                    if any(flat[cell] in (1, 3) for cell in cells):
+                        continue
+                    p[cells] += 50 * int(flat[cells].sum()) ** 2 + 1
+    return p.reshape(board_size, board_size)
+
+def random_states(board_size, n, seed):
+    rng = np.random.default_rng(seed)
+    return rng.choice(4, size=(n, board_size, board_size), p=[0.75, 0.12, 0.1, 0.03])
+
+FLEETS = ([5, 4, 3, 3, 2], [4, 3, 2], [3, 3], [2])
+
+def test_density_map():
+    for board_size in (6, 10):
+        for game_state in random_states(board_size, 10, board_size):
+            for fleet in FLEETS:
+                assert (density_map(game_state, fleet) == reference(game_state, fleet)).all()
+
+def test_fleet_density_batch():
+    game_states = random_states(10, 8, 1)
+    fleets = [FLEETS[i % len(FLEETS)] for i in range(len(game_states))]
+    ship_sizes = (2, 3, 4, 5)
+    p = fleet_density(game_states, ship_sizes, fleet_counts(fleets, ship_sizes))
+    for game_state, fleet, density in zip(game_states, fleets, p):
+        assert (density == reference(game_state, fleet)).all()
+
+def masks(game_state):
+    flat = game_state.reshape(-1)
+    return [sum(1 << int(cell) for cell in np.flatnonzero(flat == value)) for value in (1, 2, 3)]
+
+def test_tracker_update():
+    tracker = DensityTracker((2, 3, 4, 5), 10)
+    rng = np.random.default_rng(2)
+    game_state = np.zeros((10, 10), dtype=int)
+    for step in range(60):
+        # mostly single shots, sometimes a whole new position (a collapsed or branched hypothesis)
+        if step % 10 == 9:
+            game_state = random_states(10, 1, step)[0]
+        else:
+            game_state.flat[rng.integers(100)] = rng.integers(4)
+        tracker.update(*masks(game_state))
+        for fleet in FLEETS:
+            assert (tracker.density(fleet) == reference(game_state, fleet)).all()
+
+def test_tracker_copy():
+    tracker = DensityTracker((2, 3), 6)
+    game_state = random_states(6, 1, 3)[0]
+    copy = tracker.copy()
+    copy.update(*masks(game_state))
+    assert (tracker.density([3, 2]) == reference(np.zeros((6, 6), dtype=int), [3, 2])).all()
+    assert (copy.density([3, 2]) == reference(game_state, [3, 2])).all()
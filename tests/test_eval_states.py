@@ -0,0 +1,23 @@
+import numpy as np
+import battleship
+
+################################################################################
+# Tests of the batched evaluation on degenerate batches.                       #
+################################################################################
+
+def test_empty_batch():
+    for game_states in ([], np.zeros((0, 6, 6), dtype=int)):
+        p, best_moves = battleship.eval_states(game_states, [])
+        assert p.shape[0] == 0 and p.shape[1] == p.shape[2]
+        assert best_moves.shape == (0, 2)
+    assert battleship.eval_states(np.zeros((0, 6, 6), dtype=int), [])[0].shape == (0, 6, 6)
+
+def test_dead_boards():
+    game_states = np.zeros((3, 10, 10), dtype=int)
+    # every cell missed, and a finished game
+    game_states[1] = 1
+    game_states[2, 0, 0:2] = 3
+    p, best_moves = battleship.eval_states(game_states, [[5, 4, 3, 3, 2], [2], []])
+    assert not np.isnan(p).any()
+    assert p[0].sum() == 17 and (p[1:] == 0).all()
+    assert best_moves[1:].tolist() == [[-1, -1], [-1, -1]]
@@ -0,0 +1,39 @@
+import battleship
+
+################################################################################
+# Tests of the sink hypotheses of Solution.move.                               #
+################################################################################
+SHIPS = [(5, 0, 0, 0), (4, 2, 0, 0), (3, 4, 0, 0), (3, 6, 0, 0), (2, 8, 0, 0)]
+
+def play(moves):
+    game = battleship.Game(battleship.Board(True, ships=SHIPS), engine='exact')
+    for move in moves:
+        game.solution.move(move)
+    return game
+
+def test_equal_sizes_branch_once():
+    # the 3 at (4, 0) is sunk from its far end; either 3 of the fleet could be it
+    game = play([(4, 3), (4, 0), (4, 1), (4, 2)])
+    children = game.solution.instances
+    assert sorted(child.ship for child in children) == [(4, 0, 0, 3), (4, 1, 0, 2)]
+    assert game.solution.size == 3
+    for child, total in children.items():
+        assert child.copies == game.solution.remaining_ships.count(child.ship[3])
+        assert total == child.copies * game.count_states(child.state)
+
+def test_equal_sizes_keep_weights():
+    game = play([(4, 3), (4, 0), (4, 1), (4, 2)])
+    totals = {child.ship: total for child, total in game.solution.instances.items()}
+    state = game.solution.state
+    three = game.count_states(state.sink(sum(1 << cell for cell in (40, 41, 42)), 3))
+    two = game.count_states(state.sink(sum(1 << cell for cell in (41, 42)), 2))
+    # as many fleets as when every 3 of the fleet was its own hypothesis
+    assert totals == {(4, 0, 0, 3): 2 * three, (4, 1, 0, 2): two}
+
+def test_equal_sizes_collapse():
+    # misses above and below (4, 0) rule out the 2, so the 3 is confirmed on the root
+    game = play([(4, 3), (4, 0), (4, 1), (4, 2), (3, 0), (5, 0)])
+    game.solution.eval_state()
+    assert len(game.solution.instances) == 0
+    assert game.solution.confirmed_ships == {(4, 0, 0, 3)}
+    assert sorted(game.solution.remaining_ships) == [2, 3, 4, 5]